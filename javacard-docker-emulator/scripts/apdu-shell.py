@@ -8,11 +8,17 @@ Fonctionnalités:
 - Support des scripts
 - Parsing TLV automatique
 - Colorisation de la sortie
+
+Le script n'utilise que la bibliothèque standard : pour de gros scripts
+(-f), il peut être lancé tel quel sous PyPy3 (`pypy3 apdu-shell.py -f ...`),
+dont le JIT accélère le parsing TLV et le hexdump.
 """
 
 import argparse
+import binascii
+import collections
+import functools
 import os
-import readline
 import socket
 import struct
 import sys
@@ -23,6 +29,12 @@ from typing import Optional, Dict, List, Tuple
 JCARDSIM_HOST = os.getenv('JCARDSIM_HOST', 'localhost')
 JCARDSIM_PORT = int(os.getenv('JCARDSIM_PORT', '9025'))
 
+# Nombre d'APDUs envoyés sans attendre leur réponse en mode --pipeline
+PIPELINE_DEPTH = 16
+
+# Nombre maximal d'entrées d'historique chargées au démarrage
+_HISTORY_TAIL = 1000
+
 # Couleurs
 class Colors:
     HEADER = '\033[95m'
@@ -35,6 +47,16 @@ class Colors:
     BOLD = '\033[1m'
 
 
+# Pas de couleurs hors terminal ou si NO_COLOR est défini
+if not sys.stdout.isatty() or os.environ.get('NO_COLOR'):
+    for _name in ('HEADER', 'BLUE', 'CYAN', 'GREEN', 'YELLOW', 'RED', 'END', 'BOLD'):
+        setattr(Colors, _name, '')
+
+# Prompts pré-calculés
+_PROMPT_CONN = f"{Colors.GREEN}APDU>{Colors.END} "
+_PROMPT_DIS = f"{Colors.RED}APDU>{Colors.END} "
+
+
 # Macros pré-définies
 MACROS: Dict[str, str] = {
     'select_isd': '00A4040008A000000003000000',
@@ -43,6 +65,66 @@ MACROS: Dict[str, str] = {
     'init_update': '8050000008{random}00',
 }
 
+# Macros constantes (sans paramètre {...}) décodées une seule fois
+_MACROS_BYTES: Dict[str, bytes] = {
+    name: bytes.fromhex(apdu) for name, apdu in MACROS.items() if '{' not in apdu
+}
+
+# Descriptions des Status Words, indexées par la valeur entière SW1SW2
+_SW_TABLE: Dict[int, str] = {
+    0x9000: 'Success',
+    0x6283: 'Selected file invalidated',
+    0x6300: 'Authentication failed',
+    0x6700: 'Wrong length',
+    0x6982: 'Security status not satisfied',
+    0x6983: 'Authentication method blocked',
+    0x6984: 'Reference data invalidated',
+    0x6985: 'Conditions not satisfied',
+    0x6A80: 'Wrong data',
+    0x6A81: 'Function not supported',
+    0x6A82: 'File or application not found',
+    0x6A86: 'Incorrect P1-P2',
+    0x6A88: 'Referenced data not found',
+    0x6D00: 'Instruction not supported',
+    0x6E00: 'Class not supported',
+    0x6F00: 'Unknown error',
+}
+
+# Commandes du shell qui ne sont pas des APDUs
+_SHELL_KEYWORDS = frozenset(('quit', 'exit', 'q', 'help', 'connect', 'disconnect'))
+
+
+@functools.lru_cache(maxsize=256)
+def _decode_sw_cached(sw_int: int) -> str:
+    """Décode un Status Word donné sous forme entière (SW1 << 8 | SW2)."""
+    desc = _SW_TABLE.get(sw_int)
+    if desc:
+        return desc
+    
+    hi = sw_int & 0xFF00
+    if hi == 0x6100:
+        return f"More data available ({sw_int & 0xFF} bytes)"
+    elif sw_int & 0xFFF0 == 0x63C0:
+        return f"PIN tries remaining: {sw_int & 0x0F}"
+    elif hi == 0x6C00:
+        return f"Wrong Le, expected {sw_int & 0xFF}"
+    
+    return "Unknown"
+
+
+# Séparateurs ignorés dans la saisie d'un APDU
+_STRIP_TABLE = str.maketrans('', '', ' :')
+
+# Table hexdump : octets imprimables conservés, les autres remplacés par '.'
+_PRINTABLE_OR_DOT = bytes((b if 32 <= b < 127 else 0x2E) for b in range(256))
+
+# Réponse sans données (erreur d'envoi ou SW seul)
+_NO_DATA = memoryview(b'')
+
+# Octets ASCII imprimables : une valeur est affichable si bytes.translate
+# les supprime tous
+_PRINTABLE = bytes(range(32, 127))
+
 
 class TLVParser:
     """Parser pour les données TLV."""
@@ -51,189 +133,253 @@ class TLVParser:
     def parse(data: bytes, indent: int = 0) -> List[str]:
         """Parse les données TLV et retourne une liste de lignes formatées."""
         lines = []
-        i = 0
-        prefix = "  " * indent
-        
-        while i < len(data):
-            # Tag (1 ou 2 bytes)
-            tag = data[i]
-            i += 1
-            
-            if (tag & 0x1F) == 0x1F:  # Tag sur 2 bytes
-                if i >= len(data):
-                    break
-                tag = (tag << 8) | data[i]
+        mv = memoryview(data)
+
+        # Pile explicite de (début, fin, indentation) au lieu de la récursion
+        stack = [(0, len(mv), indent)]
+
+        while stack:
+            i, end, depth = stack.pop()
+            prefix = "  " * depth
+
+            while i < end:
+                # Tag (1 ou 2 bytes)
+                tag = mv[i]
                 i += 1
-            
-            # Longueur
-            if i >= len(data):
-                break
-            
-            length = data[i]
-            i += 1
-            
-            if length & 0x80:  # Longueur sur plusieurs bytes
-                num_bytes = length & 0x7F
-                if i + num_bytes > len(data):
+
+                # Cas courant : tag sur 1 byte et longueur courte (< 0x80)
+                if (tag & 0x1F) != 0x1F and i < end and mv[i] < 0x80:
+                    length = mv[i]
+                    i += 1
+                else:
+                    if (tag & 0x1F) == 0x1F:  # Tag sur 2 bytes
+                        if i >= end:
+                            break
+                        tag = (tag << 8) | mv[i]
+                        i += 1
+
+                    # Longueur
+                    if i >= end:
+                        break
+
+                    length = mv[i]
+                    i += 1
+
+                    if length & 0x80:  # Longueur sur plusieurs bytes
+                        num_bytes = length & 0x7F
+                        if i + num_bytes > end:
+                            break
+                        length = 0
+                        for _ in range(num_bytes):
+                            length = (length << 8) | mv[i]
+                            i += 1
+
+                # Valeur
+                if i + length > end:
                     break
-                length = int.from_bytes(data[i:i+num_bytes], 'big')
-                i += num_bytes
-            
-            # Valeur
-            if i + length > len(data):
-                break
-            
-            value = data[i:i+length]
-            i += length
-            
-            # Formater
-            tag_hex = f"{tag:04X}" if tag > 0xFF else f"{tag:02X}"
-            
-            # Essayer de décoder en ASCII si possible
-            try:
-                if all(32 <= b < 127 for b in value):
+
+                start = i
+                value = mv[start:start+length].tobytes()
+                i += length
+
+                # Formater
+                tag_hex = f"{tag:04X}" if tag > 0xFF else f"{tag:02X}"
+
+                # Décoder en ASCII si tous les octets sont imprimables
+                if not value.translate(None, _PRINTABLE):
                     value_str = f'"{value.decode("ascii")}"'
                 else:
                     value_str = value.hex().upper()
-            except:
-                value_str = value.hex().upper()
-            
-            lines.append(f"{prefix}Tag {tag_hex} ({length}): {value_str}")
-            
-            # Parser récursivement si c'est un tag construit
-            if tag & 0x20:
-                lines.extend(TLVParser.parse(value, indent + 1))
-        
+
+                lines.append(f"{prefix}Tag {tag_hex} ({length}): {value_str}")
+
+                # Tag construit : reprendre le niveau courant après les enfants
+                if tag & 0x20:
+                    stack.append((i, end, depth))
+                    stack.append((start, start + length, depth + 1))
+                    break
+
         return lines
 
 
 class APDUShell:
     """Shell interactif APDU."""
     
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, interactive: bool = True):
         self.host = host
         self.port = port
         self.socket: Optional[socket.socket] = None
+        self._rfile = None
+        self._wfile = None
+        self._hdr_buf = bytearray(2)
+        self._sendbuf = bytearray(2 + 65535)
         self.history: List[str] = []
         self.macros = MACROS.copy()
+        self._macro_bytes = _MACROS_BYTES.copy()
         self.verbose = True
         self.parse_tlv = False
+        self.interactive = interactive
         
-        # Configurer readline
+        # Configurer readline (inutile en mode -c / -f)
         self.histfile = os.path.expanduser("~/.apdu_history")
+        self._readline = None
+        self._history_loaded = 0
+        if self.interactive:
+            # Import différé : libreadline et ~/.inputrc ne sont chargés qu'ici
+            import readline
+            self._readline = readline
+            self._load_history()
+    
+    def _load_history(self):
+        """Charge uniquement les dernières entrées de l'historique."""
         try:
-            readline.read_history_file(self.histfile)
+            with open(self.histfile, 'r', errors='replace') as f:
+                tail = collections.deque(f, maxlen=_HISTORY_TAIL)
         except FileNotFoundError:
-            pass
+            return
+        
+        for line in tail:
+            line = line.rstrip('\n')
+            if line:
+                self._readline.add_history(line)
+        self._history_loaded = self._readline.get_current_history_length()
+    
+    def _save_history(self):
+        """Ajoute au fichier les seules entrées de cette session.
+
+        Le fichier n'est jamais réécrit : les entrées au-delà de celles
+        chargées au démarrage sont conservées.
+        """
+        readline = self._readline
+        new = readline.get_current_history_length() - self._history_loaded
+        if new <= 0:
+            return
+        if os.path.exists(self.histfile):
+            readline.append_history_file(new, self.histfile)
+        else:
+            readline.write_history_file(self.histfile)
     
     def connect(self) -> bool:
         """Établit la connexion."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)
-            self.socket.connect((self.host, self.port))
-            print(f"{Colors.GREEN}✓ Connected to {self.host}:{self.port}{Colors.END}")
-            return True
+            sock.settimeout(10)
+            sock.connect((self.host, self.port))
+            # Petits échanges requête/réponse : désactiver Nagle
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
         except Exception as e:
+            sock.close()
             print(f"{Colors.RED}✗ Connection failed: {e}{Colors.END}")
             return False
+        
+        # Connexion établie : l'état du shell n'est mis à jour qu'ici
+        self.socket = sock
+        # Lectures bufferisées : moins d'appels recv pour les longues réponses
+        self._rfile = sock.makefile('rb', buffering=65536)
+        self._wfile = sock.makefile('wb')
+        print(f"{Colors.GREEN}✓ Connected to {self.host}:{self.port}{Colors.END}")
+        return True
     
     def disconnect(self):
         """Ferme la connexion."""
         if self.socket:
+            if self._rfile is not None:
+                self._rfile.close()
+            if self._wfile is not None:
+                self._wfile.close()
             self.socket.close()
             self.socket = None
+            self._rfile = None
+            self._wfile = None
     
-    def send_apdu(self, apdu_hex: str) -> Tuple[bytes, bytes]:
+    def send_apdu(self, apdu: bytes) -> Tuple[memoryview, bytes]:
         """Envoie un APDU."""
-        apdu = bytes.fromhex(apdu_hex.replace(' ', '').replace(':', ''))
-        
         if not self.socket:
             if not self.connect():
-                return b'', b''
+                return _NO_DATA, b''
         
         try:
-            # Envoyer
-            length = struct.pack('>H', len(apdu))
-            self.socket.sendall(length + apdu)
-            
-            # Recevoir
-            resp_len = struct.unpack('>H', self.socket.recv(2))[0]
-            response = b''
-            while len(response) < resp_len:
-                response += self.socket.recv(resp_len - len(response))
-            
-            data = response[:-2] if len(response) > 2 else b''
-            sw = response[-2:] if len(response) >= 2 else b''
-            
-            return data, sw
+            self._send_frame(apdu)
+            self._wfile.flush()
+            return self._recv_frame()
             
         except Exception as e:
             print(f"{Colors.RED}Error: {e}{Colors.END}")
             self.disconnect()
-            return b'', b''
+            return _NO_DATA, b''
+    
+    def _send_frame(self, apdu: bytes):
+        """Écrit un APDU préfixé de sa longueur (sans flush)."""
+        n = len(apdu)
+        struct.pack_into('>H', self._sendbuf, 0, n)
+        self._sendbuf[2:2+n] = apdu
+        self._wfile.write(memoryview(self._sendbuf)[:2+n])
+    
+    def _recv_frame(self) -> Tuple[memoryview, bytes]:
+        """Lit une réponse préfixée de sa longueur et la sépare en data/SW.
+        
+        'data' est une vue (memoryview) sur le buffer de réception, sans copie.
+        """
+        self._recv_into(memoryview(self._hdr_buf))
+        resp_len = struct.unpack_from('>H', self._hdr_buf)[0]
+        response = bytearray(resp_len)
+        self._recv_into(memoryview(response))
+        
+        data = memoryview(response)[:-2] if len(response) > 2 else _NO_DATA
+        sw = bytes(response[-2:]) if len(response) >= 2 else b''
+        
+        return data, sw
+    
+    def _recv_into(self, buf: memoryview):
+        """Remplit entièrement 'buf' depuis la connexion."""
+        off = 0
+        while off < len(buf):
+            n = self._rfile.readinto(buf[off:])
+            if not n:
+                raise ConnectionError("Connection closed by peer")
+            off += n
     
     def decode_sw(self, sw: bytes) -> str:
         """Décode le Status Word."""
         if len(sw) != 2:
             return "Invalid SW"
         
-        sw_hex = sw.hex().upper()
-        
-        # Dictionnaire des SW
-        sw_dict = {
-            '9000': 'Success',
-            '6283': 'Selected file invalidated',
-            '6300': 'Authentication failed',
-            '6700': 'Wrong length',
-            '6982': 'Security status not satisfied',
-            '6983': 'Authentication method blocked',
-            '6984': 'Reference data invalidated',
-            '6985': 'Conditions not satisfied',
-            '6A80': 'Wrong data',
-            '6A81': 'Function not supported',
-            '6A82': 'File or application not found',
-            '6A86': 'Incorrect P1-P2',
-            '6A88': 'Referenced data not found',
-            '6D00': 'Instruction not supported',
-            '6E00': 'Class not supported',
-            '6F00': 'Unknown error',
-        }
-        
-        if sw_hex in sw_dict:
-            return sw_dict[sw_hex]
-        elif sw_hex.startswith('61'):
-            return f"More data available ({sw[1]} bytes)"
-        elif sw_hex.startswith('63C'):
-            return f"PIN tries remaining: {sw[1] & 0x0F}"
-        elif sw_hex.startswith('6C'):
-            return f"Wrong Le, expected {sw[1]}"
-        
-        return "Unknown"
+        return _decode_sw_cached((sw[0] << 8) | sw[1])
     
-    def print_response(self, data: bytes, sw: bytes):
-        """Affiche la réponse formatée."""
+    def print_response(self, data: memoryview, sw: bytes):
+        """Affiche la réponse formatée.
+        
+        'data' est une vue en tête du buffer de réception (voir _recv_frame).
+        """
         # Status Word
         sw_desc = self.decode_sw(sw)
         sw_color = Colors.GREEN if sw == b'\x90\x00' else Colors.YELLOW
-        print(f"{sw_color}SW: {sw.hex().upper()} ({sw_desc}){Colors.END}")
+        parts = [f"{sw_color}SW: {sw.hex().upper()} ({sw_desc}){Colors.END}"]
         
         # Données
         if data:
-            print(f"{Colors.CYAN}Data ({len(data)} bytes):{Colors.END}")
+            parts.append(f"{Colors.CYAN}Data ({len(data)} bytes):{Colors.END}")
             
             # Affichage hexadécimal formaté
-            for i in range(0, len(data), 16):
-                chunk = data[i:i+16]
-                hex_str = ' '.join(f'{b:02X}' for b in chunk)
-                ascii_str = ''.join(chr(b) if 32 <= b < 127 else '.' for b in chunk)
-                print(f"  {i:04X}: {hex_str:<48} {ascii_str}")
+            # Traduction directe du buffer sous la vue, sans copie en bytes ;
+            # les 2 bytes de SW en fin de buffer sont exclus des tranches
+            n = len(data)
+            ascii_all = data.obj.translate(_PRINTABLE_OR_DOT).decode('latin-1')
+            for i in range(0, n, 16):
+                hex_str = binascii.hexlify(data[i:i+16], ' ').upper().decode('ascii')
+                parts.append(f"  {i:04X}: {hex_str:<48} {ascii_all[i:min(i + 16, n)]}")
             
             # Parser TLV si activé
             if self.parse_tlv:
-                print(f"\n{Colors.CYAN}TLV Structure:{Colors.END}")
+                parts.append(f"\n{Colors.CYAN}TLV Structure:{Colors.END}")
                 for line in TLVParser.parse(data):
-                    print(f"  {line}")
+                    parts.append(f"  {line}")
+        
+        # Une seule écriture pour toute la réponse
+        sys.stdout.write("\n".join(parts) + "\n")
     
     def show_help(self):
         """Affiche l'aide."""
@@ -298,30 +444,123 @@ class APDUShell:
         # C'est un APDU
         try:
             # Nettoyer
-            apdu_hex = cmd.replace(' ', '').replace(':', '').upper()
+            apdu_hex = cmd.translate(_STRIP_TABLE).upper()
             
-            # Vérifier le format
-            if not all(c in '0123456789ABCDEF' for c in apdu_hex):
+            # Vérifier le format (bytes.fromhex valide les caractères)
+            try:
+                apdu = bytes.fromhex(apdu_hex)
+            except ValueError:
                 print(f"{Colors.RED}Invalid hex format{Colors.END}")
                 return True
             
-            if len(apdu_hex) < 8:
+            if len(apdu) < 4:
                 print(f"{Colors.RED}APDU too short (minimum 4 bytes){Colors.END}")
                 return True
             
-            # Envoyer
-            print(f"{Colors.BLUE}→ {apdu_hex}{Colors.END}")
-            data, sw = self.send_apdu(apdu_hex)
-            
-            if sw:
-                self.print_response(data, sw)
-                self.history.append(apdu_hex)
+            self._exchange(apdu_hex, apdu)
             
         except Exception as e:
             print(f"{Colors.RED}Error: {e}{Colors.END}")
         
         return True
     
+    def _exchange(self, apdu_hex: str, apdu: bytes):
+        """Envoie un APDU déjà converti et affiche sa réponse."""
+        print(f"{Colors.BLUE}→ {apdu_hex}{Colors.END}")
+        data, sw = self.send_apdu(apdu)
+        self._show_result(apdu_hex, data, sw)
+    
+    def _show_result(self, apdu_hex: str, data: memoryview, sw: bytes):
+        """Affiche la réponse d'un APDU et l'ajoute à l'historique."""
+        if sw:
+            self.print_response(data, sw)
+            self.history.append(apdu_hex)
+    
+    def execute_file(self, path: str, pipeline: bool = False):
+        """Exécute un script de commandes.
+        
+        Les lignes APDU sont converties en une seule passe avant l'envoi. En
+        mode pipeline, jusqu'à PIPELINE_DEPTH APDUs consécutifs sont envoyés
+        sans attendre leurs réponses ; les autres commandes (/tlv, /macro...)
+        servent de barrière.
+        """
+        entries: List[Tuple[str, Optional[str], Optional[bytes]]] = []
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    apdu_hex, apdu = self._parse_script_apdu(line)
+                    entries.append((line, apdu_hex, apdu))
+        
+        if not pipeline:
+            for line, apdu_hex, apdu in entries:
+                print(f"\n>>> {line}")
+                if apdu is None:
+                    self.execute_command(line)
+                else:
+                    self._exchange(apdu_hex, apdu)
+            return
+        
+        pending: collections.deque = collections.deque()
+        for line, apdu_hex, apdu in entries:
+            if apdu is None:
+                self._drain_pipeline(pending)
+                print(f"\n>>> {line}")
+                self.execute_command(line)
+                continue
+            
+            if not self.socket and not self.connect():
+                continue
+            
+            try:
+                self._send_frame(apdu)
+                pending.append((line, apdu_hex))
+                if len(pending) >= PIPELINE_DEPTH:
+                    self._wfile.flush()
+                    self._drain_pipeline(pending, keep=PIPELINE_DEPTH - 1)
+            except Exception as e:
+                print(f"{Colors.RED}Error: {e}{Colors.END}")
+                pending.clear()
+                self.disconnect()
+        
+        self._drain_pipeline(pending)
+    
+    def _drain_pipeline(self, pending: collections.deque, keep: int = 0):
+        """Lit les réponses en attente jusqu'à n'en laisser que 'keep'."""
+        if not pending:
+            return
+        
+        try:
+            self._wfile.flush()
+            while len(pending) > keep:
+                line, apdu_hex = pending.popleft()
+                data, sw = self._recv_frame()
+                print(f"\n>>> {line}")
+                print(f"{Colors.BLUE}→ {apdu_hex}{Colors.END}")
+                self._show_result(apdu_hex, data, sw)
+        except Exception as e:
+            print(f"{Colors.RED}Error: {e}{Colors.END}")
+            pending.clear()
+            self.disconnect()
+    
+    @staticmethod
+    def _parse_script_apdu(line: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """Convertit une ligne de script en APDU, ou (None, None) si ce
+        n'en est pas un valide (la ligne passe alors par execute_command)."""
+        if line.startswith('/') or line.lower() in _SHELL_KEYWORDS:
+            return None, None
+        
+        apdu_hex = line.translate(_STRIP_TABLE).upper()
+        try:
+            apdu = bytes.fromhex(apdu_hex)
+        except ValueError:
+            return None, None
+        
+        if len(apdu) < 4:
+            return None, None
+        
+        return apdu_hex, apdu
+    
     def handle_slash_command(self, cmd: str) -> bool:
         """Gère les commandes /."""
         parts = cmd.split(maxsplit=1)
@@ -333,6 +572,10 @@ class APDUShell:
                 print(f"\n{Colors.HEADER}Available Macros:{Colors.END}")
                 for name, apdu in self.macros.items():
                     print(f"  {name}: {apdu}")
+            elif args in self._macro_bytes:
+                apdu = self._macro_bytes[args]
+                print(f"Executing macro: {args}")
+                self._exchange(apdu.hex().upper(), apdu)
             elif args in self.macros:
                 apdu = self.macros[args]
                 print(f"Executing macro: {args}")
@@ -344,6 +587,7 @@ class APDUShell:
             parts = args.split(maxsplit=1)
             if len(parts) == 2:
                 self.macros[parts[0]] = parts[1]
+                self._macro_bytes.pop(parts[0], None)
                 print(f"Defined macro: {parts[0]}")
             else:
                 print(f"{Colors.RED}Usage: /define <name> <apdu>{Colors.END}")
@@ -398,7 +642,7 @@ class APDUShell:
         try:
             while True:
                 try:
-                    prompt = f"{Colors.GREEN}APDU>{Colors.END} " if self.socket else f"{Colors.RED}APDU>{Colors.END} "
+                    prompt = _PROMPT_CONN if self.socket else _PROMPT_DIS
                     cmd = input(prompt)
                     
                     if not self.execute_command(cmd):
@@ -410,10 +654,11 @@ class APDUShell:
                     break
         finally:
             # Sauvegarder l'historique
-            try:
-                readline.write_history_file(self.histfile)
-            except:
-                pass
+            if self._readline is not None:
+                try:
+                    self._save_history()
+                except:
+                    pass
             
             self.disconnect()
             print(f"\n{Colors.GREEN}Goodbye!{Colors.END}")
@@ -425,10 +670,13 @@ def main():
     parser.add_argument('--port', type=int, default=JCARDSIM_PORT, help='jCardSim port')
     parser.add_argument('-c', '--command', help='Execute single command and exit')
     parser.add_argument('-f', '--file', help='Execute commands from file')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='With -f, send APDUs without waiting for each response')
     
     args = parser.parse_args()
     
-    shell = APDUShell(args.host, args.port)
+    interactive = not (args.command or args.file)
+    shell = APDUShell(args.host, args.port, interactive=interactive)
     
     if args.command:
         shell.connect()
@@ -436,12 +684,7 @@ def main():
         shell.disconnect()
     elif args.file:
         shell.connect()
-        with open(args.file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    print(f"\n>>> {line}")
-                    shell.execute_command(line)
+        shell.execute_file(args.file, pipeline=args.pipeline)
         shell.disconnect()
     else:
         shell.run()
@@ -8,14 +8,25 @@ permettre l'envoi de commandes APDU à distance.
 Protocole:
 - Client envoie: 2 bytes (big-endian) longueur + APDU
 - Serveur répond: 2 bytes (big-endian) longueur + Response
+
+Les APDUs sont traités en processus par jCardSim via JPype
+(RealJCardSimulator), ou par SimpleCardSimulator si JPype est absent.
+
+JCARDSIM_SOCKET_PATH=/chemin/socket écoute sur un socket Unix au lieu de TCP.
+JCARDSIM_LOG_LEVEL=DEBUG active la trace de chaque APDU échangé.
 """
 
+import asyncio
+import binascii
+import functools
+import logging
 import os
+import re
+import select
 import socket
 import struct
 import subprocess
 import sys
-import threading
 import time
 from typing import Optional
 
@@ -23,9 +34,78 @@ from typing import Optional
 HOST = os.getenv('JCARDSIM_HOST', '0.0.0.0')
 PORT = int(os.getenv('JCARDSIM_PORT', '9025'))
 
+# Chemin d'un socket Unix à utiliser à la place de TCP (même hôte)
+SOCKET_PATH = os.getenv('JCARDSIM_SOCKET_PATH')
+
+# Niveau de log (DEBUG pour tracer chaque APDU échangé)
+LOG_LEVEL = os.getenv('JCARDSIM_LOG_LEVEL', 'INFO').upper()
+
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Taille des buffers socket (SO_SNDBUF / SO_RCVBUF)
+SOCKET_BUFSIZE = int(os.getenv('APDU_SOCKET_BUFSIZE', '262144'))
+
+# Keepalive TCP : premier sondage après 30 s d'inactivité, puis toutes les
+# 10 s, connexion déclarée morte après 3 sondages sans réponse
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+# Délai maximal (secondes) d'attente du démarrage de jCardSim
+STARTUP_TIMEOUT = float(os.getenv('JCARDSIM_STARTUP_TIMEOUT', '2'))
+
+# Clés de config jCardSim : com.licel.jcardsim.card.applet.<n>.AID / .Class
+_APPLET_RE = re.compile(r'applet\.(\d+)\.(AID|Class)')
+
+# Status Words et réponses fixes
+SW_OK = b'\x90\x00'
+SW_ERR = b'\x6F\x00'
+SW_INS_NOT_SUPPORTED = b'\x6D\x00'
+SW_WRONG_LENGTH = b'\x67\x00'
+SW_COND_NOT_SATISFIED = b'\x69\x85'
+HELLO_RESPONSE = b'Hello World!' + SW_OK
+
+# Entiers big-endian des commandes Counter
+_U16 = struct.Struct('>H')
+_U32 = struct.Struct('>I')
+
+# Octets qui ne sont pas des chiffres hexadécimaux (supprimés des réponses)
+_NON_HEX = bytes(b for b in range(256) if b not in b'0123456789ABCDEFabcdef')
+
+
+@functools.lru_cache(maxsize=1)
+def _build_classpath() -> str:
+    """Construit le classpath Java (calculé une seule fois par processus)."""
+    jars = []
+
+    # Bibliothèques puis applets
+    for lib_dir in ('/app/lib', '/app/applets'):
+        if os.path.isdir(lib_dir):
+            with os.scandir(lib_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.jar'):
+                        jars.append(entry.path)
+
+    return ':'.join(jars)
+
+
+def _set_keepalive(sock: socket.socket):
+    """Active le keepalive TCP pour détecter rapidement un pair disparu."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Options propres à Linux : ignorées si la plateforme ne les expose pas
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+
 
 class JCardSimProcess:
-    """Gère le processus jCardSim."""
+    """Gère le processus jCardSim (APDUScriptTool piloté par stdin/stdout).
+
+    Ancien mode, non utilisé par main() : chaque APDU fait un aller-retour
+    texte hexadécimal par pipe. RealJCardSimulator est le chemin par défaut.
+    """
     
     def __init__(self, config_file: str = None):
         self.config_file = config_file
@@ -35,7 +115,7 @@ class JCardSimProcess:
     
     def start(self):
         """Démarre jCardSim en mode console."""
-        classpath = self._build_classpath()
+        classpath = _build_classpath()
         
         cmd = [
             'java',
@@ -56,38 +136,32 @@ class JCardSimProcess:
             text=False
         )
         
-        # Attendre que jCardSim soit prêt
-        time.sleep(2)
-        
-        if self.process.poll() is not None:
-            stderr = self.process.stderr.read().decode()
-            raise RuntimeError(f"jCardSim failed to start: {stderr}")
+        # Attendre que jCardSim soit prêt : première sortie du processus
+        # (sans la consommer), arrêt prématuré ou délai maximal écoulé
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if self.process.poll() is not None:
+                stderr = self.process.stderr.read().decode()
+                raise RuntimeError(f"jCardSim failed to start: {stderr}")
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            
+            readable, _, _ = select.select([self.process.stdout], [], [], min(remaining, 0.1))
+            if readable:
+                # EOF sur stdout : le processus se termine, l'erreur sera levée
+                if not self.process.stdout.peek(1):
+                    self.process.wait()
+                    continue
+                break
         
         print("jCardSim started successfully")
     
-    def _build_classpath(self) -> str:
-        """Construit le classpath Java."""
-        jars = []
-        lib_dir = '/app/lib'
-        
-        if os.path.exists(lib_dir):
-            for f in os.listdir(lib_dir):
-                if f.endswith('.jar'):
-                    jars.append(os.path.join(lib_dir, f))
-        
-        # Ajouter les applets
-        applets_dir = '/app/applets'
-        if os.path.exists(applets_dir):
-            for f in os.listdir(applets_dir):
-                if f.endswith('.jar'):
-                    jars.append(os.path.join(applets_dir, f))
-        
-        return ':'.join(jars)
-    
     def send_apdu(self, apdu: bytes) -> bytes:
         """Envoie un APDU à jCardSim et retourne la réponse."""
         if not self.process:
-            return b'\x6F\x00'  # Erreur
+            return SW_ERR
         
         try:
             # Format pour APDUScriptTool: hex string + newline
@@ -96,20 +170,18 @@ class JCardSimProcess:
             self.process.stdin.flush()
             
             # Lire la réponse (hex string)
-            response_line = self.process.stdout.readline().decode().strip()
+            response_line = self.process.stdout.readline()
             
-            # Parser la réponse
-            if response_line:
-                # Enlever les préfixes/suffixes éventuels
-                response_hex = ''.join(c for c in response_line if c in '0123456789ABCDEFabcdef')
-                if response_hex:
-                    return bytes.fromhex(response_hex)
+            # Parser la réponse : enlever les préfixes/suffixes éventuels
+            response_hex = response_line.translate(None, _NON_HEX)
+            if response_hex:
+                return binascii.unhexlify(response_hex)
             
-            return b'\x6F\x00'
+            return SW_ERR
             
         except Exception as e:
             print(f"APDU error: {e}")
-            return b'\x6F\x00'
+            return SW_ERR
     
     def stop(self):
         """Arrête jCardSim."""
@@ -145,17 +217,40 @@ class SimpleCardSimulator:
         # ATR par défaut
         self.atr = bytes.fromhex('3B8F8001804F0CA000000306030001000000006A')
 
+        # Tables de dispatch INS -> handler
+        self._hw_handlers = {
+            0x00: self._hw_hello,
+            0x01: self._hw_echo,
+            0x02: self._hw_get_data,
+            0x03: self._hw_put_data,
+            0x20: self._hw_verify_pin,
+            0xF0: self._hw_get_status,
+        }
+        self._ctr_handlers = {
+            0x10: self._ctr_get,
+            0x11: self._ctr_increment,
+            0x12: self._ctr_decrement,
+            0x13: self._ctr_reset,
+            0x14: self._ctr_set_value,
+            0x15: self._ctr_set_limit,
+            0x16: self._ctr_get_info,
+            0x17: self._ctr_add_value,
+            0x18: self._ctr_sub_value,
+        }
+
     def process_apdu(self, apdu: bytes) -> bytes:
         """Traite un APDU et retourne la réponse."""
         if len(apdu) < 4:
-            return b'\x67\x00'  # Wrong length
+            return SW_WRONG_LENGTH
 
-        cla = apdu[0]
-        ins = apdu[1]
-        p1 = apdu[2]
-        p2 = apdu[3]
-        lc = apdu[4] if len(apdu) > 4 else 0
-        data = apdu[5:5+lc] if len(apdu) > 5 else b''
+        # Vue sans copie : 'data' est une memoryview sur l'APDU
+        mv = memoryview(apdu)
+        cla = mv[0]
+        ins = mv[1]
+        p1 = mv[2]
+        p2 = mv[3]
+        lc = mv[4] if len(mv) > 4 else 0
+        data = mv[5:5+lc] if len(mv) > 5 else b''
 
         # SELECT command
         if ins == 0xA4:
@@ -163,7 +258,7 @@ class SimpleCardSimulator:
 
         # GET RESPONSE
         if ins == 0xC0:
-            return b'\x90\x00'
+            return SW_OK
 
         # Commandes propriétaires (CLA = 0x80)
         if cla == 0x80:
@@ -173,245 +268,294 @@ class SimpleCardSimulator:
             elif self.selected_aid == self.AID_COUNTER:
                 return self._process_counter(ins, p1, p2, data)
 
-        return b'\x6D\x00'  # Instruction not supported
+        return SW_INS_NOT_SUPPORTED
 
     def _process_helloworld(self, ins, p1, p2, data) -> bytes:
         """Commandes HelloWorld Applet."""
         self.hw_usage_count += 1
 
-        if ins == 0x00:  # HELLO
-            return b'Hello World!\x90\x00'
-
-        elif ins == 0x01:  # ECHO
-            if data:
-                return data + b'\x90\x00'
-            return b'\x90\x00'
-
-        elif ins == 0x02:  # GET_DATA
-            stored = self.data_store.get('hw_data', b'')
-            if stored:
-                return stored + b'\x90\x00'
-            return b'\x69\x85'  # Conditions not satisfied
-
-        elif ins == 0x03:  # PUT_DATA
-            if not self.hw_pin_validated:
-                return b'\x69\x85'  # Security status not satisfied
-            if data:
-                self.data_store['hw_data'] = data
-            return b'\x90\x00'
-
-        elif ins == 0x20:  # VERIFY PIN
-            if data == b'1234':
-                self.hw_pin_validated = True
-                self.hw_pin_tries = 3
-                return b'\x90\x00'
-            else:
-                self.hw_pin_tries = max(0, self.hw_pin_tries - 1)
-                return bytes([0x63, 0xC0 | self.hw_pin_tries])
-
-        elif ins == 0xF0:  # GET STATUS
-            data_len = len(self.data_store.get('hw_data', b''))
-            status = bytes([
-                0x01, 0x00,  # Version
-                (self.hw_usage_count >> 8) & 0xFF, self.hw_usage_count & 0xFF,
-                self.hw_pin_tries,
-                0x01 if self.hw_pin_validated else 0x00,
-                (data_len >> 8) & 0xFF, data_len & 0xFF
-            ])
-            return status + b'\x90\x00'
-
-        return b'\x6D\x00'
+        handler = self._hw_handlers.get(ins)
+        if handler is None:
+            return SW_INS_NOT_SUPPORTED
+        return handler(p1, p2, data)
+
+    def _hw_hello(self, p1, p2, data) -> bytes:
+        """HELLO (INS 00)."""
+        return HELLO_RESPONSE
+
+    def _hw_echo(self, p1, p2, data) -> bytes:
+        """ECHO (INS 01)."""
+        if data:
+            return bytes(data) + SW_OK
+        return SW_OK
+
+    def _hw_get_data(self, p1, p2, data) -> bytes:
+        """GET_DATA (INS 02)."""
+        stored = self.data_store.get('hw_data', b'')
+        if stored:
+            return stored + SW_OK
+        return SW_COND_NOT_SATISFIED
+
+    def _hw_put_data(self, p1, p2, data) -> bytes:
+        """PUT_DATA (INS 03)."""
+        if not self.hw_pin_validated:
+            return SW_COND_NOT_SATISFIED  # Security status not satisfied
+        if data:
+            self.data_store['hw_data'] = bytes(data)
+        return SW_OK
+
+    def _hw_verify_pin(self, p1, p2, data) -> bytes:
+        """VERIFY PIN (INS 20)."""
+        if data == b'1234':
+            self.hw_pin_validated = True
+            self.hw_pin_tries = 3
+            return SW_OK
+        else:
+            self.hw_pin_tries = max(0, self.hw_pin_tries - 1)
+            return bytes([0x63, 0xC0 | self.hw_pin_tries])
+
+    def _hw_get_status(self, p1, p2, data) -> bytes:
+        """GET STATUS (INS F0)."""
+        data_len = len(self.data_store.get('hw_data', b''))
+        status = bytes([
+            0x01, 0x00,  # Version
+            (self.hw_usage_count >> 8) & 0xFF, self.hw_usage_count & 0xFF,
+            self.hw_pin_tries,
+            0x01 if self.hw_pin_validated else 0x00,
+            (data_len >> 8) & 0xFF, data_len & 0xFF
+        ])
+        return status + SW_OK
 
     def _process_counter(self, ins, p1, p2, data) -> bytes:
         """Commandes Counter Applet."""
         self.counter_op_count += 1
 
-        def counter_bytes():
-            return self.counter_value.to_bytes(4, 'big')
-
-        if ins == 0x10:  # GET_COUNTER
-            return counter_bytes() + b'\x90\x00'
-
-        elif ins == 0x11:  # INCREMENT
-            inc = p1 if p1 > 0 else 1
-            new_val = self.counter_value + inc
-            if self.counter_limit_enabled and new_val > self.counter_limit:
-                return b'\x69\x85'  # Conditions not satisfied
-            if new_val > 0xFFFFFFFF:
-                return b'\x69\x85'
-            self.counter_value = new_val
-            return counter_bytes() + b'\x90\x00'
-
-        elif ins == 0x12:  # DECREMENT
-            dec = p1 if p1 > 0 else 1
-            if self.counter_value < dec:
-                return b'\x69\x85'
-            self.counter_value -= dec
-            return counter_bytes() + b'\x90\x00'
-
-        elif ins == 0x13:  # RESET
-            self.counter_value = 0
-            return b'\x90\x00'
-
-        elif ins == 0x14:  # SET_VALUE
-            if len(data) != 4:
-                return b'\x67\x00'
-            new_val = int.from_bytes(data, 'big')
-            if self.counter_limit_enabled and new_val > self.counter_limit:
-                return b'\x69\x85'
-            self.counter_value = new_val
-            return b'\x90\x00'
-
-        elif ins == 0x15:  # SET_LIMIT
-            if len(data) != 4:
-                return b'\x67\x00'
-            self.counter_limit = int.from_bytes(data, 'big')
-            self.counter_limit_enabled = (p1 == 0x01)
-            return b'\x90\x00'
-
-        elif ins == 0x16:  # GET_INFO
-            result = counter_bytes()
-            result += self.counter_limit.to_bytes(4, 'big')
-            result += bytes([0x01 if self.counter_limit_enabled else 0x00])
-            result += self.counter_op_count.to_bytes(2, 'big')
-            return result + b'\x90\x00'
-
-        elif ins == 0x17:  # ADD_VALUE
-            if len(data) != 2:
-                return b'\x67\x00'
-            add_val = int.from_bytes(data, 'big')
-            new_val = self.counter_value + add_val
-            if self.counter_limit_enabled and new_val > self.counter_limit:
-                return b'\x69\x85'
-            if new_val > 0xFFFFFFFF:
-                return b'\x69\x85'
-            self.counter_value = new_val
-            return counter_bytes() + b'\x90\x00'
-
-        elif ins == 0x18:  # SUB_VALUE
-            if len(data) != 2:
-                return b'\x67\x00'
-            sub_val = int.from_bytes(data, 'big')
-            if self.counter_value < sub_val:
-                return b'\x69\x85'
-            self.counter_value -= sub_val
-            return counter_bytes() + b'\x90\x00'
-
-        return b'\x6D\x00'
+        handler = self._ctr_handlers.get(ins)
+        if handler is None:
+            return SW_INS_NOT_SUPPORTED
+        return handler(p1, p2, data)
+
+    def _counter_bytes(self) -> bytes:
+        """Valeur du compteur sur 4 bytes big-endian."""
+        return _U32.pack(self.counter_value)
+
+    def _ctr_get(self, p1, p2, data) -> bytes:
+        """GET_COUNTER (INS 10)."""
+        return self._counter_bytes() + SW_OK
+
+    def _ctr_increment(self, p1, p2, data) -> bytes:
+        """INCREMENT (INS 11)."""
+        inc = p1 if p1 > 0 else 1
+        new_val = self.counter_value + inc
+        if self.counter_limit_enabled and new_val > self.counter_limit:
+            return SW_COND_NOT_SATISFIED
+        if new_val > 0xFFFFFFFF:
+            return SW_COND_NOT_SATISFIED
+        self.counter_value = new_val
+        return self._counter_bytes() + SW_OK
+
+    def _ctr_decrement(self, p1, p2, data) -> bytes:
+        """DECREMENT (INS 12)."""
+        dec = p1 if p1 > 0 else 1
+        if self.counter_value < dec:
+            return SW_COND_NOT_SATISFIED
+        self.counter_value -= dec
+        return self._counter_bytes() + SW_OK
+
+    def _ctr_reset(self, p1, p2, data) -> bytes:
+        """RESET (INS 13)."""
+        self.counter_value = 0
+        return SW_OK
+
+    def _ctr_set_value(self, p1, p2, data) -> bytes:
+        """SET_VALUE (INS 14)."""
+        if len(data) != 4:
+            return SW_WRONG_LENGTH
+        new_val = _U32.unpack(data)[0]
+        if self.counter_limit_enabled and new_val > self.counter_limit:
+            return SW_COND_NOT_SATISFIED
+        self.counter_value = new_val
+        return SW_OK
+
+    def _ctr_set_limit(self, p1, p2, data) -> bytes:
+        """SET_LIMIT (INS 15)."""
+        if len(data) != 4:
+            return SW_WRONG_LENGTH
+        self.counter_limit = _U32.unpack(data)[0]
+        self.counter_limit_enabled = (p1 == 0x01)
+        return SW_OK
+
+    def _ctr_get_info(self, p1, p2, data) -> bytes:
+        """GET_INFO (INS 16)."""
+        result = self._counter_bytes()
+        result += _U32.pack(self.counter_limit)
+        result += bytes([0x01 if self.counter_limit_enabled else 0x00])
+        result += _U16.pack(self.counter_op_count)
+        return result + SW_OK
+
+    def _ctr_add_value(self, p1, p2, data) -> bytes:
+        """ADD_VALUE (INS 17)."""
+        if len(data) != 2:
+            return SW_WRONG_LENGTH
+        add_val = _U16.unpack(data)[0]
+        new_val = self.counter_value + add_val
+        if self.counter_limit_enabled and new_val > self.counter_limit:
+            return SW_COND_NOT_SATISFIED
+        if new_val > 0xFFFFFFFF:
+            return SW_COND_NOT_SATISFIED
+        self.counter_value = new_val
+        return self._counter_bytes() + SW_OK
+
+    def _ctr_sub_value(self, p1, p2, data) -> bytes:
+        """SUB_VALUE (INS 18)."""
+        if len(data) != 2:
+            return SW_WRONG_LENGTH
+        sub_val = _U16.unpack(data)[0]
+        if self.counter_value < sub_val:
+            return SW_COND_NOT_SATISFIED
+        self.counter_value -= sub_val
+        return self._counter_bytes() + SW_OK
     
     def _handle_select(self, apdu: bytes) -> bytes:
         """Gère la commande SELECT."""
         if len(apdu) < 5:
-            return b'\x67\x00'
+            return SW_WRONG_LENGTH
         
         lc = apdu[4]
         if len(apdu) < 5 + lc:
-            return b'\x67\x00'
+            return SW_WRONG_LENGTH
         
         aid = apdu[5:5+lc]
         self.selected_aid = aid
         
         # FCI template simplifié
         fci = bytes([0x6F, len(aid) + 2, 0x84, len(aid)]) + aid
-        return fci + b'\x90\x00'
+        return fci + SW_OK
 
 
 class SocketServer:
-    """Serveur socket TCP pour les APDUs."""
+    """Serveur socket TCP pour les APDUs.
+
+    Les connexions sont servies par des coroutines asyncio sur une seule
+    boucle d'événements (epoll sous Linux), sans thread par client.
+    """
     
-    def __init__(self, host: str, port: int, simulator):
+    def __init__(self, host: str, port: int, simulator, unix_path: Optional[str] = None):
         self.host = host
         self.port = port
         self.simulator = simulator
+        self.unix_path = unix_path
         self.server_socket: Optional[socket.socket] = None
         self.running = False
     
     def start(self):
         """Démarre le serveur."""
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
+        if self.unix_path:
+            # Socket Unix : pas de pile TCP pour les clients locaux
+            self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if os.path.exists(self.unix_path):
+                os.unlink(self.unix_path)
+            address = self.unix_path
+        else:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            address = (self.host, self.port)
+        
+        # Hérités par les sockets acceptés
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFSIZE)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFSIZE)
+        self.server_socket.bind(address)
+        self.server_socket.listen(socket.SOMAXCONN)
+        self.server_socket.setblocking(False)
         self.running = True
         
-        print(f"Socket server listening on {self.host}:{self.port}")
+        if self.unix_path:
+            print(f"Socket server listening on unix:{self.unix_path}")
+        else:
+            print(f"Socket server listening on {self.host}:{self.port}")
         
-        while self.running:
-            try:
-                client, addr = self.server_socket.accept()
-                print(f"Client connected: {addr}")
-                
-                # Gérer le client dans un thread
-                thread = threading.Thread(target=self._handle_client, args=(client,))
-                thread.daemon = True
-                thread.start()
-                
-            except socket.error:
-                if self.running:
-                    raise
+        asyncio.run(self._serve())
+    
+    async def _serve(self):
+        """Boucle asyncio : accepte les clients jusqu'à l'arrêt."""
+        if self.unix_path:
+            server = await asyncio.start_unix_server(
+                self._handle_client, sock=self.server_socket)
+        else:
+            server = await asyncio.start_server(
+                self._handle_client, sock=self.server_socket)
+        
+        async with server:
+            await server.serve_forever()
     
-    def _handle_client(self, client: socket.socket):
-        """Gère un client connecté."""
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Gère une connexion client."""
+        client = writer.get_extra_info('socket')
+        addr = writer.get_extra_info('peername')
+        if client.family != socket.AF_UNIX:
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            _set_keepalive(client)
+        print(f"Client connected: {addr}")
+        
         try:
-            while self.running:
-                # Lire la longueur (2 bytes big-endian)
-                length_bytes = self._recv_exact(client, 2)
-                if not length_bytes:
+            while True:
+                # Trame : longueur (2 bytes big-endian) + APDU
+                length = _U16.unpack(await reader.readexactly(2))[0]
+                if length == 0:
                     break
+                apdu = await reader.readexactly(length)
                 
-                length = struct.unpack('>H', length_bytes)[0]
-                
-                # Lire l'APDU
-                apdu = self._recv_exact(client, length)
-                if not apdu:
-                    break
+                debug = logger.isEnabledFor(logging.DEBUG)
+                if debug:
+                    logger.debug("← APDU: %s", apdu.hex().upper())
                 
-                print(f"← APDU: {apdu.hex().upper()}")
-                
-                # Traiter l'APDU
+                # Traiter l'APDU (appel synchrone : le simulateur n'est pas
+                # thread-safe et répond en quelques microsecondes)
                 response = self.simulator.process_apdu(apdu)
                 
-                print(f"→ Response: {response.hex().upper()}")
-                
-                # Envoyer la réponse
-                resp_length = struct.pack('>H', len(response))
-                client.sendall(resp_length + response)
+                if debug:
+                    logger.debug("→ Response: %s", response.hex().upper())
                 
+                # Les réponses à des APDUs pipelinés partent ensemble : drain()
+                # ne bloque que si le tampon d'émission dépasse sa limite haute
+                writer.write(_U16.pack(len(response)) + response)
+                await writer.drain()
+        
+        except asyncio.IncompleteReadError:
+            pass
         except Exception as e:
             print(f"Client error: {e}")
         finally:
-            client.close()
+            writer.close()
             print("Client disconnected")
     
-    def _recv_exact(self, sock: socket.socket, length: int) -> Optional[bytes]:
-        """Reçoit exactement 'length' bytes."""
-        data = b''
-        while len(data) < length:
-            try:
-                chunk = sock.recv(length - len(data))
-                if not chunk:
-                    return None
-                data += chunk
-            except socket.error:
-                return None
-        return data
-    
     def stop(self):
         """Arrête le serveur."""
         self.running = False
         if self.server_socket:
             self.server_socket.close()
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
 
 
 class RealJCardSimulator:
-    """Simulateur utilisant le vrai jCardSim avec les applets compilés."""
+    """Simulateur utilisant le vrai jCardSim avec les applets compilés.
+
+    Chemin par défaut : les APDUs sont transmis en processus via JPype
+    (CardSimulator.transmitCommand), sans pipe ni conversion hexadécimale.
+    """
 
     def __init__(self, config_file: str = '/app/config/jcardsim.cfg'):
         self.config_file = config_file
         self.simulator = None
         self.jpype = None
+        self._fallback: Optional[SimpleCardSimulator] = None
         self._init_jcardsim()
 
+        if self.simulator is None:
+            # Simulateur de repli unique : conserve son état entre les APDUs
+            self._fallback = SimpleCardSimulator()
+
     def _init_jcardsim(self):
         """Initialise jCardSim via JPype."""
         try:
@@ -420,17 +564,19 @@ class RealJCardSimulator:
             self.jpype = jpype
 
             if not jpype.isJVMStarted():
-                classpath = self._build_classpath()
+                classpath = _build_classpath()
                 print(f"Starting JVM with classpath: {classpath}")
                 jpype.startJVM(classpath=classpath.split(':'))
 
             from com.licel.jcardsim.smartcardio import CardSimulator
             from com.licel.jcardsim.utils import AIDUtil
             from javacard.framework import AID
+            from javax.smartcardio import CommandAPDU
 
             self.CardSimulator = CardSimulator
             self.AIDUtil = AIDUtil
             self.AID = AID
+            self.CommandAPDU = CommandAPDU
             self.simulator = CardSimulator()
 
             # Charger les applets depuis la config
@@ -447,24 +593,8 @@ class RealJCardSimulator:
             traceback.print_exc()
             self.simulator = None
 
-    def _build_classpath(self) -> str:
-        """Construit le classpath Java."""
-        import os
-        jars = []
-
-        for lib_dir in ['/app/lib', '/app/applets']:
-            if os.path.exists(lib_dir):
-                for f in os.listdir(lib_dir):
-                    if f.endswith('.jar'):
-                        jars.append(os.path.join(lib_dir, f))
-
-        return ':'.join(jars)
-
     def _load_applets_from_config(self):
         """Charge les applets définis dans le fichier de config."""
-        import os
-        import re
-
         if not os.path.exists(self.config_file):
             print(f"Config file not found: {self.config_file}")
             return
@@ -482,7 +612,7 @@ class RealJCardSimulator:
                     value = parts[1].strip()
 
                     # Extraire le numéro d'applet
-                    match = re.search(r'applet\.(\d+)\.(AID|Class)', key)
+                    match = _APPLET_RE.search(key)
                     if match:
                         idx = match.group(1)
                         prop = match.group(2)
@@ -515,13 +645,11 @@ class RealJCardSimulator:
         """Traite un APDU via jCardSim."""
         if self.simulator is None:
             # Fallback vers simulateur simple
-            return SimpleCardSimulator().process_apdu(apdu)
+            return self._fallback.process_apdu(apdu)
 
         try:
-            from javax.smartcardio import CommandAPDU, ResponseAPDU
-
-            # Créer la commande APDU
-            cmd = CommandAPDU(bytes(apdu))
+            # Créer la commande APDU (JPype accepte directement des bytes)
+            cmd = self.CommandAPDU(apdu)
             response = self.simulator.transmitCommand(cmd)
 
             # Construire la réponse complète
@@ -540,7 +668,7 @@ class RealJCardSimulator:
             print(f"APDU processing error: {e}")
             import traceback
             traceback.print_exc()
-            return b'\x6F\x00'
+            return SW_ERR
 
 
 def main():
@@ -563,7 +691,7 @@ def main():
         simulator = SimpleCardSimulator()
 
     # Créer et démarrer le serveur socket
-    server = SocketServer(HOST, PORT, simulator)
+    server = SocketServer(HOST, PORT, simulator, unix_path=SOCKET_PATH)
 
     try:
         server.start()
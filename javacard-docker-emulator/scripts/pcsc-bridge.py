@@ -13,11 +13,11 @@ Protocole jCardSim Socket:
 
 import argparse
 import logging
+import os
 import select
 import socket
 import struct
 import sys
-import threading
 import time
 from typing import Optional, Tuple
 
@@ -37,30 +37,87 @@ VPCD_CTRL_ON = 1
 VPCD_CTRL_RESET = 2
 VPCD_CTRL_ATR = 4
 
+# Taille du tampon de réception VPCD (commande + APDU de 255 bytes max)
+VPCD_RECV_BUFSIZE = 4096
+
+# Préfixes de longueur jCardSim précalculés pour les APDUs courts
+# (4 bytes d'en-tête + Lc + 255 bytes de données + Le)
+_LEN_PREFIX = tuple(struct.pack('>H', n) for n in range(261))
+
+# Taille des buffers socket (SO_SNDBUF / SO_RCVBUF)
+SOCKET_BUFSIZE = int(os.getenv('APDU_SOCKET_BUFSIZE', '262144'))
+
+# Keepalive TCP : premier sondage après 30 s d'inactivité, puis toutes les
+# 10 s, connexion déclarée morte après 3 sondages sans réponse
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+# Préfixe de --jcardsim-host désignant un socket Unix (unix:///chemin)
+UNIX_PREFIX = 'unix://'
+
 # ATR par défaut pour une JavaCard
 DEFAULT_ATR = bytes.fromhex('3B8F8001804F0CA000000306030001000000006A')
+# Réponse VPCD à Get ATR : longueur (1 byte) + ATR
+_ATR_RESPONSE = bytes([len(DEFAULT_ATR)]) + DEFAULT_ATR
+
+
+def _set_keepalive(sock: socket.socket):
+    """Active le keepalive TCP pour détecter rapidement un pair disparu."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Options propres à Linux : ignorées si la plateforme ne les expose pas
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
 
 
 class JCardSimClient:
-    """Client pour communiquer avec jCardSim via socket."""
+    """Client pour communiquer avec jCardSim via socket.
+    
+    Une seule connexion persistante, rouverte après une erreur. Pas de
+    verrou ni de pool : VPCDServer sert pcscd sur le thread d'acceptation,
+    send_apdu() n'a donc qu'un appelant et un seul APDU est en cours.
+    """
     
     def __init__(self, host: str, port: int):
         self.host = host
         self.port = port
         self.socket: Optional[socket.socket] = None
-        self.lock = threading.Lock()
     
     def connect(self) -> bool:
         """Établit la connexion avec jCardSim."""
+        self.disconnect()
+        self.socket = self._open_socket()
+        return self.socket is not None
+    
+    def _open_socket(self) -> Optional[socket.socket]:
+        """Ouvre une connexion avec jCardSim."""
+        sock = None
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)
-            self.socket.connect((self.host, self.port))
-            logger.info(f"Connected to jCardSim at {self.host}:{self.port}")
-            return True
+            if self.host.startswith(UNIX_PREFIX):
+                # Socket Unix (jcardsim-socket-server avec JCARDSIM_SOCKET_PATH)
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                address = self.host[len(UNIX_PREFIX):]
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                address = (self.host, self.port)
+            sock.settimeout(10)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFSIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFSIZE)
+            sock.connect(address)
+            if sock.family != socket.AF_UNIX:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                _set_keepalive(sock)
+                logger.info(f"Connected to jCardSim at {self.host}:{self.port}")
+            else:
+                logger.info(f"Connected to jCardSim at {self.host}")
+            return sock
         except Exception as e:
             logger.error(f"Failed to connect to jCardSim: {e}")
-            return False
+            if sock:
+                sock.close()
+            return None
     
     def disconnect(self):
         """Ferme la connexion."""
@@ -73,50 +130,61 @@ class JCardSimClient:
     
     def send_apdu(self, apdu: bytes) -> Optional[bytes]:
         """Envoie un APDU et reçoit la réponse."""
-        with self.lock:
-            if not self.socket:
-                if not self.connect():
-                    return None
+        if not self.socket:
+            if not self.connect():
+                return None
+        
+        sock = self.socket
+        response = None
+        try:
+            # Envoyer la longueur (2 bytes big-endian) et l'APDU en un seul
+            # sendmsg (vecteur de deux tampons, sans concaténation) pour ne
+            # pas émettre deux petits segments TCP
+            n = len(apdu)
+            length = _LEN_PREFIX[n] if n < 261 else struct.pack('>H', n)
+            sent = sock.sendmsg((length, apdu))
+            if sent < 2 + n:
+                # Envoi partiel : compléter avec le reste de la trame
+                sock.sendall((length + apdu)[sent:])
             
-            try:
-                # Envoyer la longueur (2 bytes big-endian) puis l'APDU
-                length = struct.pack('>H', len(apdu))
-                self.socket.sendall(length + apdu)
-                
-                logger.debug(f"Sent APDU: {apdu.hex().upper()}")
-                
-                # Recevoir la longueur de la réponse
-                resp_len_bytes = self._recv_exact(2)
-                if not resp_len_bytes:
-                    return None
-                
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("Sent APDU: %s", apdu.hex().upper())
+            
+            # Recevoir la longueur de la réponse
+            resp_len_bytes = self._recv_exact(sock, 2)
+            if resp_len_bytes:
                 resp_len = struct.unpack('>H', resp_len_bytes)[0]
                 
                 # Recevoir la réponse
-                response = self._recv_exact(resp_len)
-                if response:
-                    logger.debug(f"Received response: {response.hex().upper()}")
-                
-                return response
-                
-            except Exception as e:
-                logger.error(f"APDU exchange failed: {e}")
-                self.disconnect()
-                return None
+                response = self._recv_exact(sock, resp_len)
+                if response and debug:
+                    logger.debug("Received response: %s", response.hex().upper())
+            
+        except Exception as e:
+            logger.error(f"APDU exchange failed: {e}")
+        
+        if response is None:
+            # Connexion dans un état inconnu : rouverte au prochain APDU
+            self.disconnect()
+        
+        return response
     
-    def _recv_exact(self, length: int) -> Optional[bytes]:
+    def _recv_exact(self, sock: socket.socket, length: int) -> Optional[bytes]:
         """Reçoit exactement 'length' bytes."""
-        data = b''
-        while len(data) < length:
+        buf = bytearray(length)
+        view = memoryview(buf)
+        got = 0
+        while got < length:
             try:
-                chunk = self.socket.recv(length - len(data))
-                if not chunk:
+                n = sock.recv_into(view[got:])
+                if not n:
                     return None
-                data += chunk
+                got += n
             except socket.timeout:
                 logger.error("Receive timeout")
                 return None
-        return data
+        return bytes(buf)
     
     def power_on(self) -> bytes:
         """Simule la mise sous tension et retourne l'ATR."""
@@ -147,13 +215,22 @@ class VPCDServer:
         self.client_socket: Optional[socket.socket] = None
         self.running = False
         self.powered = False
+        # Tampon de réception : un recv_into ramène en général l'octet de
+        # commande et l'APDU qui suit en un seul appel système
+        self._vpcd_buf = bytearray(VPCD_RECV_BUFSIZE)
+        self._vpcd_view = memoryview(self._vpcd_buf)
+        self._vpcd_start = 0
+        self._vpcd_end = 0
     
     def start(self):
         """Démarre le serveur VPCD."""
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Hérités par les sockets acceptés
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFSIZE)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFSIZE)
         self.server_socket.bind(('0.0.0.0', self.port))
-        self.server_socket.listen(1)
+        self.server_socket.listen(socket.SOMAXCONN)
         
         logger.info(f"VPCD server listening on port {self.port}")
         self.running = True
@@ -166,7 +243,9 @@ class VPCDServer:
                     continue
                 
                 self.client_socket, addr = self.server_socket.accept()
+                self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 logger.info(f"pcscd connected from {addr}")
+                self._vpcd_start = self._vpcd_end = 0
                 
                 self._handle_client()
                 
@@ -179,12 +258,12 @@ class VPCDServer:
         while self.running and self.client_socket:
             try:
                 # Recevoir la commande de pcscd
-                data = self.client_socket.recv(1)
-                if not data:
+                if not self._fill(1):
                     logger.info("pcscd disconnected")
                     break
                 
-                cmd = data[0]
+                cmd = self._vpcd_buf[self._vpcd_start]
+                self._vpcd_start += 1
                 
                 if cmd == VPCD_CTRL_OFF:
                     logger.debug("VPCD: Power OFF")
@@ -208,9 +287,8 @@ class VPCDServer:
                 
                 elif cmd == VPCD_CTRL_ATR:
                     logger.debug("VPCD: Get ATR")
-                    atr = self.jcardsim.power_on() if self.powered else b''
-                    # Envoyer la longueur puis l'ATR
-                    self._send_response(bytes([len(atr)]) + atr)
+                    # Envoyer la longueur puis l'ATR (longueur nulle hors tension)
+                    self._send_response(_ATR_RESPONSE if self.powered else b'\x00')
                 
                 else:
                     # C'est un APDU - le premier byte est la longueur
@@ -219,7 +297,7 @@ class VPCDServer:
                         # Recevoir le reste de l'APDU
                         apdu = self._recv_exact(apdu_len)
                         if apdu:
-                            logger.debug(f"VPCD: APDU command ({apdu_len} bytes)")
+                            logger.debug("VPCD: APDU command (%d bytes)", apdu_len)
                             # Envoyer à jCardSim
                             response = self.jcardsim.send_apdu(apdu)
                             if response:
@@ -244,25 +322,47 @@ class VPCDServer:
             self.client_socket = None
     
     def _send_response(self, data: bytes):
-        """Envoie une réponse à pcscd."""
+        """Envoie une réponse à pcscd.
+        
+        'data' doit contenir la réponse complète (longueur incluse) : un seul
+        sendall par réponse évite deux segments TCP consécutifs.
+        """
         if self.client_socket:
             try:
                 self.client_socket.sendall(data)
             except Exception as e:
                 logger.error(f"Send error: {e}")
     
+    def _fill(self, length: int) -> bool:
+        """S'assure qu'au moins 'length' bytes sont disponibles dans le tampon."""
+        if not self.client_socket:
+            return False
+        
+        if self._vpcd_end - self._vpcd_start >= length:
+            return True
+        
+        # Ramener les octets restants en tête du tampon
+        if self._vpcd_start:
+            pending = self._vpcd_end - self._vpcd_start
+            self._vpcd_buf[:pending] = self._vpcd_view[self._vpcd_start:self._vpcd_end]
+            self._vpcd_start = 0
+            self._vpcd_end = pending
+        
+        while self._vpcd_end < length:
+            n = self.client_socket.recv_into(self._vpcd_view[self._vpcd_end:])
+            if not n:
+                return False
+            self._vpcd_end += n
+        return True
+    
     def _recv_exact(self, length: int) -> Optional[bytes]:
         """Reçoit exactement 'length' bytes."""
-        if not self.client_socket:
+        if not self._fill(length):
             return None
         
-        data = b''
-        while len(data) < length:
-            chunk = self.client_socket.recv(length - len(data))
-            if not chunk:
-                return None
-            data += chunk
-        return data
+        start = self._vpcd_start
+        self._vpcd_start = start + length
+        return bytes(self._vpcd_view[start:self._vpcd_start])
     
     def stop(self):
         """Arrête le serveur."""
@@ -282,7 +382,7 @@ class VPCDServer:
 def main():
     parser = argparse.ArgumentParser(description='PC/SC Bridge to jCardSim')
     parser.add_argument('--jcardsim-host', default='localhost',
-                        help='jCardSim server host')
+                        help='jCardSim server host, or unix:///path for a Unix socket')
     parser.add_argument('--jcardsim-port', type=int, default=9025,
                         help='jCardSim server port')
     parser.add_argument('--vpcd-port', type=int, default=35963,
@@ -7,10 +7,14 @@ Ce script teste l'intégration PKCS#11 avec la carte JavaCard émulée:
 - Génération de clés
 - Opérations cryptographiques
 - Gestion des certificats
+- Débit de signature RSA (--bench N)
 """
 
+import argparse
+import functools
 import os
 import sys
+import time
 
 try:
     import PyKCS11
@@ -20,6 +24,7 @@ except ImportError:
 
 
 # Chemin du module PKCS#11 - détection automatique selon l'architecture
+@functools.lru_cache(maxsize=1)
 def find_pkcs11_lib():
     """Trouve automatiquement la bibliothèque PKCS#11."""
     possible_paths = [
@@ -35,17 +40,29 @@ def find_pkcs11_lib():
             return path
     return possible_paths[0]  # Fallback
 
-PKCS11_LIB = os.getenv('PKCS11_MODULE', find_pkcs11_lib())
+PKCS11_LIB = os.getenv('PKCS11_MODULE') or find_pkcs11_lib()
 
+# Mécanismes construits une seule fois (non modifiés par PyKCS11)
+MECH_RSA_KEY_PAIR_GEN = PyKCS11.Mechanism(PyKCS11.CKM_RSA_PKCS_KEY_PAIR_GEN)
+MECH_SHA256_RSA = PyKCS11.Mechanism(PyKCS11.CKM_SHA256_RSA_PKCS)
+MECH_RSA_PKCS = PyKCS11.Mechanism(PyKCS11.CKM_RSA_PKCS)
 
-def list_slots(pkcs11lib):
-    """Liste tous les slots disponibles."""
+
+def list_slots(pkcs11lib, verbose=False):
+    """Liste tous les slots disponibles.
+
+    Sans verbose, seuls les identifiants sont affichés (pas d'appel
+    C_GetSlotInfo / C_GetTokenInfo par slot).
+    """
     print("\n=== Slots Disponibles ===")
     
     slots = pkcs11lib.getSlotList(tokenPresent=True)
     print(f"Nombre total de slots: {len(slots)}")
     
     for slot_id in slots:
+        if not verbose:
+            print(f"\nSlot {slot_id}")
+            continue
         try:
             slot_info = pkcs11lib.getSlotInfo(slot_id)
             print(f"\nSlot {slot_id}:")
@@ -71,11 +88,15 @@ def list_slots(pkcs11lib):
 
 
 def list_objects(session, obj_class=None):
-    """Liste les objets dans le token."""
+    """Liste les objets dans le token.
+
+    'obj_class' filtre côté module PKCS#11 (CKA_CLASS dans le template de
+    recherche) plutôt qu'en parcourant tous les objets.
+    """
     print("\n=== Objets dans le Token ===")
     
     template = []
-    if obj_class:
+    if obj_class is not None:
         template = [(PyKCS11.CKA_CLASS, obj_class)]
     
     objects = session.findObjects(template)
@@ -140,7 +161,7 @@ def generate_rsa_keypair(session, key_label="Test RSA Key", key_size=2048):
         pub_key, priv_key = session.generateKeyPair(
             public_template,
             private_template,
-            mecha=PyKCS11.Mechanism(PyKCS11.CKM_RSA_PKCS_KEY_PAIR_GEN)
+            mecha=MECH_RSA_KEY_PAIR_GEN
         )
         print(f"✓ Clés générées avec succès")
         print(f"  Public key handle: {pub_key}")
@@ -159,9 +180,10 @@ def test_sign_verify(session, priv_key, pub_key):
     
     try:
         # Signature
-        mechanism = PyKCS11.Mechanism(PyKCS11.CKM_SHA256_RSA_PKCS)
-        signature = bytes(session.sign(priv_key, test_data, mechanism))
-        print(f"✓ Signature: {signature[:32].hex()}...")
+        mechanism = MECH_SHA256_RSA
+        # Liste PyKCS11 transmise telle quelle à verify(), sans copie en bytes
+        signature = session.sign(priv_key, test_data, mechanism)
+        print(f"✓ Signature: {bytes(signature[:32]).hex()}...")
         
         # Vérification
         result = session.verify(pub_key, test_data, signature, mechanism)
@@ -181,9 +203,9 @@ def test_encrypt_decrypt(session, pub_key, priv_key):
     
     try:
         # Chiffrement avec clé publique
-        mechanism = PyKCS11.Mechanism(PyKCS11.CKM_RSA_PKCS)
-        encrypted = bytes(session.encrypt(pub_key, test_data, mechanism))
-        print(f"✓ Chiffré: {encrypted[:32].hex()}...")
+        mechanism = MECH_RSA_PKCS
+        encrypted = session.encrypt(pub_key, test_data, mechanism)
+        print(f"✓ Chiffré: {bytes(encrypted[:32]).hex()}...")
         
         # Déchiffrement avec clé privée
         decrypted = bytes(session.decrypt(priv_key, encrypted, mechanism))
@@ -201,7 +223,36 @@ def test_encrypt_decrypt(session, pub_key, priv_key):
         return False
 
 
+def bench_sign(session, priv_key, n=1000):
+    """Mesure le débit de signature RSA (signatures par seconde)."""
+    print(f"\n=== Benchmark Signature RSA ({n} signatures) ===")
+    
+    # Mécanisme et données réutilisés d'une signature à l'autre
+    mechanism = MECH_SHA256_RSA
+    data = b'x' * 32
+    
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            session.sign(priv_key, data, mechanism)
+        elapsed = time.perf_counter() - start
+    except PyKCS11.PyKCS11Error as e:
+        print(f"✗ Erreur: {e}")
+        return 0.0
+    
+    rate = n / elapsed
+    print(f"✓ {rate:.1f} signatures/s ({elapsed * 1000 / n:.2f} ms/signature)")
+    return rate
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Tests PKCS#11 avec la JavaCard émulée')
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help='Génère une paire de clés et mesure N signatures RSA')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Affiche aussi le détail (slot, token) de chaque slot')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("  Test PKCS#11 avec JavaCard Émulée")
     print("=" * 60)
@@ -216,29 +267,18 @@ def main():
         print(f"✗ Erreur de chargement: {e}")
         sys.exit(1)
     
-    # Lister les slots
-    slots = list_slots(pkcs11lib)
+    # Lister les slots (détail par slot seulement en mode verbeux)
+    slots = list_slots(pkcs11lib, args.verbose)
     
     if not slots:
-        print("Aucun slot disponible")
-        sys.exit(1)
-    
-    # Trouver un slot avec token
-    token_slot = None
-    for slot_id in slots:
-        try:
-            slot_info = pkcs11lib.getSlotInfo(slot_id)
-            if slot_info.flags & PyKCS11.CKF_TOKEN_PRESENT:
-                token_slot = slot_id
-                break
-        except:
-            pass
-    
-    if token_slot is None:
         print("\n✗ Aucun token trouvé")
         print("Assurez-vous que jCardSim et le bridge PC/SC sont actifs")
         sys.exit(1)
     
+    # getSlotList(tokenPresent=True) ne retourne que des slots avec token :
+    # le premier convient, sans nouvel appel C_GetSlotInfo par slot
+    token_slot = slots[0]
+    
     print(f"\n✓ Utilisation du slot {token_slot}")
     
     # Ouvrir une session
@@ -260,9 +300,14 @@ def main():
         # Lister les objets existants
         list_objects(session)
         
+        if args.bench:
+            # Mode benchmark : pas de question, clés générées d'office
+            pub_key, priv_key = generate_rsa_keypair(session)
+            if pub_key and priv_key:
+                bench_sign(session, priv_key, args.bench)
+        
         # Demander si on veut générer des clés
-        response = input("\nGénérer une paire de clés RSA de test? (o/n): ")
-        if response.lower() in ('o', 'y', 'oui', 'yes'):
+        elif input("\nGénérer une paire de clés RSA de test? (o/n): ").lower() in ('o', 'y', 'oui', 'yes'):
             pub_key, priv_key = generate_rsa_keypair(session)
             
             if pub_key and priv_key:
@@ -5,16 +5,80 @@ send-apdu.py - Outil en ligne de commande pour envoyer des APDUs à jCardSim
 Usage:
     python send-apdu.py "00A4040007A0000000041010"  # Sélection applet
     python send-apdu.py --file commands.txt          # Fichier de commandes
+    python send-apdu.py --file commands.txt --pipeline 16  # Sans attendre chaque réponse
     python send-apdu.py --interactive                # Mode interactif
 """
 
 import argparse
+import binascii
 import os
-import readline  # Pour l'historique en mode interactif
 import socket
 import struct
 import sys
-from typing import Optional, Tuple
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+
+# Séparateurs ignorés dans la saisie d'un APDU (une seule passe)
+_STRIP_TABLE = str.maketrans('', '', ' \t\r\n:')
+
+# Status Words courants
+_SW_CODES = {
+    0x9000: 'Success',
+    0x6100: 'More data available (0 bytes)',
+    0x6283: 'Card locked',
+    0x6300: 'Authentication failed',
+    0x6400: 'Execution error',
+    0x6581: 'Memory error',
+    0x6700: 'Wrong length',
+    0x6882: 'Secure messaging not supported',
+    0x6883: 'Last command of chain expected',
+    0x6884: 'Command chaining not supported',
+    0x6982: 'Security not satisfied',
+    0x6983: 'Auth method blocked',
+    0x6984: 'Reference data invalidated',
+    0x6985: 'Conditions not satisfied',
+    0x6986: 'Command not allowed',
+    0x6A80: 'Wrong data',
+    0x6A81: 'Function not supported',
+    0x6A82: 'File not found',
+    0x6A83: 'Record not found',
+    0x6A84: 'Not enough memory',
+    0x6A86: 'Incorrect P1P2',
+    0x6A88: 'Referenced data not found',
+    0x6B00: 'Wrong P1P2',
+    0x6C00: 'Wrong Le (0 expected)',
+    0x6D00: 'Instruction not supported',
+    0x6E00: 'Class not supported',
+    0x6F00: 'Unknown error',
+}
+
+
+def _build_sw_table() -> List[Optional[str]]:
+    """Précalcule la description de chaque SW indexée par (SW1 << 8) | SW2.
+    
+    None pour les codes inconnus (formatés à la demande).
+    """
+    table: List[Optional[str]] = [None] * 0x10000
+    
+    # Familles à paramètre dans SW2
+    for sw2 in range(256):
+        table[0x6100 | sw2] = f'More data ({sw2} bytes)'
+        if sw2 >= 0xC0:
+            table[0x6300 | sw2] = f'PIN tries remaining: {sw2 - 0xC0}'
+        else:
+            table[0x6300 | sw2] = f'Warning: 63{sw2:02X}'
+        table[0x6C00 | sw2] = f'Wrong Le, correct is {sw2}'
+        table[0x9F00 | sw2] = f'Data available ({sw2} bytes)'
+    
+    # Les codes exacts priment sur les familles
+    for sw, desc in _SW_CODES.items():
+        table[sw] = desc
+    
+    return table
+
+
+_SW_TABLE = _build_sw_table()
 
 
 class APDUClient:
@@ -24,6 +88,8 @@ class APDUClient:
         self.host = host
         self.port = port
         self.socket: Optional[socket.socket] = None
+        # Tampon d'envoi réutilisé: longueur (2 bytes) + APDU étendu maximal
+        self._sendbuf = bytearray(2 + 65535)
     
     def connect(self) -> bool:
         """Établit la connexion."""
@@ -31,6 +97,10 @@ class APDUClient:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.settimeout(10)
             self.socket.connect((self.host, self.port))
+            # Pas de Nagle : chaque APDU part immédiatement
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Sessions interactives longues : détecter un serveur disparu
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             print(f"✓ Connected to {self.host}:{self.port}")
             return True
         except Exception as e:
@@ -50,8 +120,61 @@ class APDUClient:
         Returns:
             Tuple (response_bytes, status_word_description)
         """
+        apdu, error = self._parse_apdu(apdu_hex)
+        if apdu is None:
+            return None, error
+        
+        return self.send_apdu_bytes(apdu)
+    
+    def send_apdu_bytes(self, apdu: bytes) -> Tuple[Optional[bytes], str]:
+        """Envoie un APDU déjà décodé et retourne la réponse."""
+        try:
+            self._send_frame(apdu)
+        except Exception as e:
+            return None, f"Error: {e}"
+        
+        return self._recv_response()
+    
+    def send_pipelined(self, entries: Iterable[Tuple[str, Optional[bytes], str]],
+                       depth: int) -> Iterator[Tuple[str, Optional[bytes], str]]:
+        """
+        Envoie une suite d'APDUs sans attendre chaque réponse.
+        
+        'entries' est le résultat de parse_apdu_file(). Jusqu'à 'depth' APDUs
+        sont en vol ; jCardSim les traite dans l'ordre, les réponses sont
+        donc lues dans l'ordre d'envoi.
+        
+        Yields:
+            Tuple (ligne, response_bytes, status_word_description)
+        """
+        pending: Deque[str] = deque()
+        
+        for line, apdu, error in entries:
+            if apdu is None:
+                # Conserver l'ordre d'affichage
+                while pending:
+                    yield (pending.popleft(), *self._recv_response())
+                yield line, None, error
+                continue
+            
+            try:
+                self._send_frame(apdu)
+            except Exception as e:
+                yield line, None, f"Error: {e}"
+                continue
+            
+            pending.append(line)
+            if len(pending) >= depth:
+                yield (pending.popleft(), *self._recv_response())
+        
+        while pending:
+            yield (pending.popleft(), *self._recv_response())
+    
+    @staticmethod
+    def _parse_apdu(apdu_hex: str) -> Tuple[Optional[bytes], str]:
+        """Convertit un APDU hexadécimal en bytes, ou (None, erreur)."""
         # Nettoyer l'entrée
-        apdu_hex = apdu_hex.replace(' ', '').replace(':', '').strip()
+        apdu_hex = apdu_hex.translate(_STRIP_TABLE)
         
         try:
             apdu = bytes.fromhex(apdu_hex)
@@ -61,11 +184,19 @@ class APDUClient:
         if len(apdu) < 4:
             return None, "APDU too short (minimum 4 bytes: CLA INS P1 P2)"
         
+        return apdu, ""
+    
+    def _send_frame(self, apdu: bytes):
+        """Envoie un APDU préfixé de sa longueur."""
+        # Envoyer: longueur (2 bytes) + APDU, dans un seul buffer
+        n = len(apdu)
+        struct.pack_into('>H', self._sendbuf, 0, n)
+        self._sendbuf[2:2+n] = apdu
+        self.socket.sendall(memoryview(self._sendbuf)[:2+n])
+    
+    def _recv_response(self) -> Tuple[Optional[bytes], str]:
+        """Reçoit une réponse préfixée de sa longueur."""
         try:
-            # Envoyer: longueur (2 bytes) + APDU
-            length = struct.pack('>H', len(apdu))
-            self.socket.sendall(length + apdu)
-            
             # Recevoir: longueur (2 bytes)
             resp_len_bytes = self._recv_exact(2)
             if not resp_len_bytes:
@@ -88,13 +219,16 @@ class APDUClient:
     
     def _recv_exact(self, length: int) -> Optional[bytes]:
         """Reçoit exactement 'length' bytes."""
-        data = b''
-        while len(data) < length:
-            chunk = self.socket.recv(length - len(data))
-            if not chunk:
+        # recv_into écrit directement dans un buffer préalloué
+        buf = bytearray(length)
+        view = memoryview(buf)
+        got = 0
+        while got < length:
+            n = self.socket.recv_into(view[got:], length - got)
+            if not n:
                 return None
-            data += chunk
-        return data
+            got += n
+        return bytes(buf)
     
     @staticmethod
     def _decode_sw(sw: bytes) -> str:
@@ -102,60 +236,35 @@ class APDUClient:
         if len(sw) != 2:
             return ""
         
-        sw1, sw2 = sw[0], sw[1]
-        sw_hex = f"{sw1:02X}{sw2:02X}"
-        
-        # Status Words courants
-        sw_codes = {
-            '9000': 'Success',
-            '6100': f'More data available ({sw2} bytes)',
-            '6283': 'Card locked',
-            '6300': 'Authentication failed',
-            '6400': 'Execution error',
-            '6581': 'Memory error',
-            '6700': 'Wrong length',
-            '6882': 'Secure messaging not supported',
-            '6883': 'Last command of chain expected',
-            '6884': 'Command chaining not supported',
-            '6982': 'Security not satisfied',
-            '6983': 'Auth method blocked',
-            '6984': 'Reference data invalidated',
-            '6985': 'Conditions not satisfied',
-            '6986': 'Command not allowed',
-            '6A80': 'Wrong data',
-            '6A81': 'Function not supported',
-            '6A82': 'File not found',
-            '6A83': 'Record not found',
-            '6A84': 'Not enough memory',
-            '6A86': 'Incorrect P1P2',
-            '6A88': 'Referenced data not found',
-            '6B00': 'Wrong P1P2',
-            '6C00': f'Wrong Le ({sw2} expected)',
-            '6D00': 'Instruction not supported',
-            '6E00': 'Class not supported',
-            '6F00': 'Unknown error',
-        }
-        
-        # Vérifier les patterns
-        if sw_hex in sw_codes:
-            return sw_codes[sw_hex]
-        elif sw_hex.startswith('61'):
-            return f'More data ({sw2} bytes)'
-        elif sw_hex.startswith('63'):
-            if sw2 >= 0xC0:
-                return f'PIN tries remaining: {sw2 - 0xC0}'
-            return f'Warning: {sw_hex}'
-        elif sw_hex.startswith('6C'):
-            return f'Wrong Le, correct is {sw2}'
-        elif sw_hex.startswith('9F'):
-            return f'Data available ({sw2} bytes)'
-        
-        return f'Unknown: {sw_hex}'
+        desc = _SW_TABLE[(sw[0] << 8) | sw[1]]
+        if desc is None:
+            return f'Unknown: {sw[0]:02X}{sw[1]:02X}'
+        return desc
+
+
+def parse_apdu_file(path: str) -> List[Tuple[str, Optional[bytes], str]]:
+    """
+    Décode un fichier de commandes avant tout envoi.
+    
+    Returns:
+        Liste de (ligne, apdu_bytes, erreur) ; apdu_bytes vaut None si la
+        ligne n'est pas un APDU valide
+    """
+    entries = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            
+            apdu, error = APDUClient._parse_apdu(line)
+            entries.append((line, apdu, error))
+    return entries
 
 
 def format_response(response: bytes) -> str:
     """Formate la réponse pour affichage."""
-    hex_str = response.hex().upper()
+    hex_str = binascii.hexlify(response).upper().decode('ascii')
     
     # Séparer les données du SW
     if len(response) >= 2:
@@ -170,6 +279,9 @@ def format_response(response: bytes) -> str:
 
 def interactive_mode(client: APDUClient):
     """Mode interactif avec historique."""
+    # Import différé : libreadline et ~/.inputrc ne sont chargés qu'ici
+    import readline  # noqa: F401
+    
     print("\n=== Mode Interactif APDU ===")
     print("Commandes: 'quit', 'exit', 'help', 'history'")
     print("Format APDU: CLA INS P1 P2 [Lc] [Data] [Le]")
@@ -238,6 +350,7 @@ Examples:
   %(prog)s "00A4040007A0000000041010"
   %(prog)s --interactive
   %(prog)s --file commands.txt
+  %(prog)s --file commands.txt --pipeline 16
   %(prog)s --host jcardsim --port 9025 "00A40400"
         """
     )
@@ -251,11 +364,16 @@ Examples:
     parser.add_argument('-i', '--interactive', action='store_true',
                         help='Interactive mode')
     parser.add_argument('-f', '--file', help='File containing APDU commands')
+    parser.add_argument('--pipeline', type=int, default=1, metavar='N',
+                        help='With --file, keep up to N APDUs in flight (default: 1)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Verbose output')
     
     args = parser.parse_args()
     
+    # Décoder le fichier avant d'ouvrir la connexion
+    entries = parse_apdu_file(args.file) if args.file and not args.interactive else None
+    
     # Créer le client
     client = APDUClient(args.host, args.port)
     
@@ -266,32 +384,27 @@ Examples:
         if args.interactive:
             interactive_mode(client)
         
-        elif args.file:
-            with open(args.file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    print(f"← {line}")
-                    response, sw_desc = client.send_apdu(line)
-                    
-                    if response:
-                        print(f"→ {format_response(response)} ({sw_desc})")
-                    else:
-                        print(f"✗ {sw_desc}")
-                    print()
+        elif entries is not None:
+            for line, response, sw_desc in client.send_pipelined(entries, args.pipeline):
+                print(f"← {line}")
+                
+                if response:
+                    print(f"→ {format_response(response)} ({sw_desc})")
+                else:
+                    print(f"✗ {sw_desc}")
+                print()
         
         elif args.apdu:
             response, sw_desc = client.send_apdu(args.apdu)
             
             if response:
+                resp_hex = binascii.hexlify(response).upper().decode('ascii')
                 if args.verbose:
                     print(f"Command:  {args.apdu}")
-                    print(f"Response: {response.hex().upper()}")
+                    print(f"Response: {resp_hex}")
                     print(f"Status:   {sw_desc}")
                 else:
-                    print(response.hex().upper())
+                    print(resp_hex)
                 sys.exit(0)
             else:
                 print(f"Error: {sw_desc}", file=sys.stderr)
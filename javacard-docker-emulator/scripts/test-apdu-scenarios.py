@@ -9,8 +9,14 @@ Ce script démontre:
 4. Toutes les commandes des deux applets
 
 Connexion directe à jCardSim via TCP/IP (port 9025)
+
+Avec --stress N, N connexions asyncio concurrentes envoient en boucle
+SELECT HelloWorld + ECHO et le débit global est affiché.
 """
 
+import argparse
+import asyncio
+import binascii
 import socket
 import struct
 import sys
@@ -21,10 +27,59 @@ import os
 JCARDSIM_HOST = os.getenv("JCARDSIM_HOST", "localhost")
 JCARDSIM_PORT = int(os.getenv("JCARDSIM_PORT", "9025"))
 
+# Séparateurs ignorés dans un APDU hexadécimal (une seule passe)
+_HEX_STRIP = str.maketrans('', '', ' :\t\r\n')
+
+# Décodage des entiers big-endian à taille fixe des réponses
+_U16 = struct.Struct('>H')
+_U32 = struct.Struct('>I')
+
 # AIDs des applets
 AID_HELLOWORLD = bytes.fromhex("F0000000010001")
 AID_COUNTER = bytes.fromhex("F0000000010002")
 
+# Significations des Status Words
+SW_MEANINGS = {
+    0x9000: "Succès",
+    0x6100: "Données disponibles (Le=00)",
+    0x6283: "Fichier désactivé",
+    0x6300: "Vérification échouée",
+    0x6400: "Erreur (pas de changement d'état)",
+    0x6581: "Erreur mémoire",
+    0x6700: "Longueur incorrecte",
+    0x6882: "Canal sécurisé non supporté",
+    0x6883: "Chaînage non supporté",
+    0x6984: "Données référencées invalides",
+    0x6985: "Conditions d'utilisation non satisfaites",
+    0x6986: "Commande non autorisée",
+    0x6A80: "Paramètres dans les données incorrects",
+    0x6A81: "Fonction non supportée",
+    0x6A82: "Fichier non trouvé",
+    0x6A83: "Enregistrement non trouvé",
+    0x6A84: "Mémoire insuffisante",
+    0x6A86: "P1-P2 incorrects",
+    0x6A88: "Données référencées non trouvées",
+    0x6B00: "Paramètres incorrects (offset)",
+    0x6D00: "INS non supporté",
+    0x6E00: "CLA non supporté",
+    0x6F00: "Erreur interne",
+}
+
+def _build_sw_table():
+    """Précalcule la signification de chaque SW, indexée par (SW1 << 8) | SW2"""
+    table = ["Code inconnu"] * 0x10000
+    for sw2 in range(256):
+        table[0x6100 | sw2] = f"{sw2} bytes disponibles"
+        table[0x6C00 | sw2] = f"Longueur exacte: {sw2}"
+    for sw2 in range(0xC0, 0xD0):
+        table[0x6300 | sw2] = f"{sw2 & 0x0F} essais restants"
+    # Les codes exacts priment sur les familles
+    for sw, meaning in SW_MEANINGS.items():
+        table[sw] = meaning
+    return table
+
+SW_TABLE = _build_sw_table()
+
 # Couleurs pour l'affichage
 class Colors:
     HEADER = '\033[95m'
@@ -35,10 +90,21 @@ class Colors:
     RED = '\033[91m'
     ENDC = '\033[0m'
     BOLD = '\033[1m'
+    HEADER_BOLD = HEADER + BOLD
+    GREEN_BOLD = GREEN + BOLD
 
 def colorize(text, color):
     return f"{color}{text}{Colors.ENDC}"
 
+# Pas de couleurs hors terminal (logs CI) ou si NO_COLOR est défini
+if not sys.stdout.isatty() or os.environ.get('NO_COLOR'):
+    for _name in ('HEADER', 'BLUE', 'CYAN', 'GREEN', 'YELLOW', 'RED', 'ENDC', 'BOLD',
+                  'HEADER_BOLD', 'GREEN_BOLD'):
+        setattr(Colors, _name, '')
+
+    def colorize(text, color):
+        return text
+
 # =============================================================================
 # CLASSE DE COMMUNICATION
 # =============================================================================
@@ -50,11 +116,15 @@ class SmartCardConnection:
         self.host = host
         self.port = port
         self.socket = None
+        # Tampon d'envoi réutilisé: 2 bytes longueur + APDU étendu maximal
+        self._sendbuf = bytearray(2 + 65535)
 
     def connect(self):
         """Établit la connexion"""
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.connect((self.host, self.port))
+        # Pas de Nagle : chaque APDU part immédiatement
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         print(colorize(f"✓ Connecté à jCardSim sur {self.host}:{self.port}", Colors.GREEN))
 
     def disconnect(self):
@@ -66,29 +136,34 @@ class SmartCardConnection:
     def send_apdu(self, apdu_hex, description=""):
         """Envoie un APDU et retourne la réponse"""
         if isinstance(apdu_hex, str):
-            apdu = bytes.fromhex(apdu_hex.replace(" ", ""))
+            apdu = bytes.fromhex(apdu_hex.translate(_HEX_STRIP))
         else:
             apdu = apdu_hex
 
         # Afficher la commande
-        print(f"\n{colorize('>> APDU:', Colors.CYAN)} {apdu.hex().upper()}")
+        print(f"\n{colorize('>> APDU:', Colors.CYAN)} {binascii.hexlify(apdu).upper().decode('ascii')}")
         if description:
             print(f"   {colorize(description, Colors.YELLOW)}")
 
-        # Envoyer: 2 bytes longueur + APDU
-        length = struct.pack('>H', len(apdu))
-        self.socket.sendall(length + apdu)
+        # Envoyer: 2 bytes longueur + APDU, dans un seul buffer
+        n = len(apdu)
+        _U16.pack_into(self._sendbuf, 0, n)
+        self._sendbuf[2:2+n] = apdu
+        self.socket.sendall(memoryview(self._sendbuf)[:2+n])
 
         # Recevoir: 2 bytes longueur + réponse
         resp_len_bytes = self._recv_exact(2)
         resp_len = struct.unpack('>H', resp_len_bytes)[0]
         response = self._recv_exact(resp_len)
 
+        # Un seul passage hexadécimal, données et SW en sont des tranches
+        resp_hex = binascii.hexlify(response).upper().decode('ascii')
+
         # Parser la réponse
         if len(response) >= 2:
             sw = response[-2:]
             data = response[:-2]
-            sw_hex = sw.hex().upper()
+            sw_hex = resp_hex[-4:]
 
             # Interpréter le SW
             sw_meaning = self._interpret_sw(sw)
@@ -100,9 +175,9 @@ class SmartCardConnection:
             else:
                 color = Colors.RED
 
-            print(f"{colorize('<< Réponse:', Colors.CYAN)} {response.hex().upper()}")
+            print(f"{colorize('<< Réponse:', Colors.CYAN)} {resp_hex}")
             if data:
-                print(f"   Data: {data.hex().upper()} ({len(data)} bytes)")
+                print(f"   Data: {resp_hex[:-4]} ({len(data)} bytes)")
                 # Essayer de décoder en ASCII
                 try:
                     ascii_data = data.decode('ascii')
@@ -114,60 +189,61 @@ class SmartCardConnection:
 
             return data, sw
         else:
-            print(f"{colorize('<< Réponse:', Colors.RED)} {response.hex().upper()} (format invalide)")
+            print(f"{colorize('<< Réponse:', Colors.RED)} {resp_hex} (format invalide)")
             return response, b'\x00\x00'
 
     def _recv_exact(self, n):
         """Reçoit exactement n bytes"""
-        data = b''
-        while len(data) < n:
-            chunk = self.socket.recv(n - len(data))
-            if not chunk:
+        # recv_into écrit directement dans un buffer préalloué
+        buf = bytearray(n)
+        view = memoryview(buf)
+        got = 0
+        while got < n:
+            count = self.socket.recv_into(view[got:], n - got)
+            if not count:
                 raise Exception("Connexion fermée")
-            data += chunk
-        return data
+            got += count
+        return bytes(buf)
 
     def _interpret_sw(self, sw):
         """Interprète le Status Word"""
-        sw1, sw2 = sw[0], sw[1]
-        sw_hex = sw.hex().upper()
-
-        sw_meanings = {
-            "9000": "Succès",
-            "6100": "Données disponibles (Le=00)",
-            "6283": "Fichier désactivé",
-            "6300": "Vérification échouée",
-            "6400": "Erreur (pas de changement d'état)",
-            "6581": "Erreur mémoire",
-            "6700": "Longueur incorrecte",
-            "6882": "Canal sécurisé non supporté",
-            "6883": "Chaînage non supporté",
-            "6984": "Données référencées invalides",
-            "6985": "Conditions d'utilisation non satisfaites",
-            "6986": "Commande non autorisée",
-            "6A80": "Paramètres dans les données incorrects",
-            "6A81": "Fonction non supportée",
-            "6A82": "Fichier non trouvé",
-            "6A83": "Enregistrement non trouvé",
-            "6A84": "Mémoire insuffisante",
-            "6A86": "P1-P2 incorrects",
-            "6A88": "Données référencées non trouvées",
-            "6B00": "Paramètres incorrects (offset)",
-            "6D00": "INS non supporté",
-            "6E00": "CLA non supporté",
-            "6F00": "Erreur interne",
-        }
-
-        if sw_hex in sw_meanings:
-            return sw_meanings[sw_hex]
-        elif sw_hex.startswith("61"):
-            return f"{sw2} bytes disponibles"
-        elif sw_hex.startswith("63C"):
-            return f"{sw2 & 0x0F} essais restants"
-        elif sw_hex.startswith("6C"):
-            return f"Longueur exacte: {sw2}"
-        else:
-            return "Code inconnu"
+        return SW_TABLE[(sw[0] << 8) | sw[1]]
+
+class AsyncSmartCardConnection:
+    """Variante asyncio de SmartCardConnection, sans affichage (mode --stress)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        # Un tampon par connexion: la réponse attendue garantit que le
+        # précédent envoi est parti avant que le tampon soit réécrit
+        self._sendbuf = bytearray(2 + 65535)
+
+    async def connect(self):
+        """Établit la connexion"""
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        sock = self.writer.get_extra_info('socket')
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    async def disconnect(self):
+        """Ferme la connexion"""
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+
+    async def send_apdu(self, apdu):
+        """Envoie un APDU (bytes) et retourne (data, sw)"""
+        n = len(apdu)
+        _U16.pack_into(self._sendbuf, 0, n)
+        self._sendbuf[2:2+n] = apdu
+        self.writer.write(memoryview(self._sendbuf)[:2+n])
+
+        resp_len = struct.unpack('>H', await self.reader.readexactly(2))[0]
+        response = await self.reader.readexactly(resp_len)
+        return response[:-2], response[-2:]
 
 # =============================================================================
 # FONCTIONS D'AIDE POUR LES COMMANDES
@@ -186,6 +262,33 @@ def build_apdu(cla, ins, p1, p2, data=None, le=None):
         apdu += bytes([le])
     return apdu
 
+# APDUs à contenu fixe, construits une seule fois au chargement du module
+SELECT_HELLOWORLD = build_select_apdu(AID_HELLOWORLD)
+SELECT_COUNTER = build_select_apdu(AID_COUNTER)
+APDU_GET_HELLO = build_apdu(0x80, 0x00, 0x00, 0x00, le=0x00)
+APDU_GET_DATA = build_apdu(0x80, 0x02, 0x00, 0x00, le=0x20)
+APDU_GET_STATUS = build_apdu(0x80, 0xF0, 0x00, 0x00, le=0x08)
+APDU_VERIFY_PIN = build_apdu(0x80, 0x20, 0x00, 0x00, b"1234")
+APDU_GET_COUNTER = build_apdu(0x80, 0x10, 0x00, 0x00, le=0x04)
+APDU_RESET_COUNTER = build_apdu(0x80, 0x13, 0x00, 0x00)
+APDU_GET_INFO = build_apdu(0x80, 0x16, 0x00, 0x00, le=0x0B)
+APDU_INCREMENT_1 = build_apdu(0x80, 0x11, 0x00, 0x00, le=0x04)
+APDU_INCREMENT_10 = build_apdu(0x80, 0x11, 0x0A, 0x00, le=0x04)
+APDU_INCREMENT_OVER_LIMIT = build_apdu(0x80, 0x11, 0x01, 0x00, le=0x04)
+APDU_DECREMENT_5 = build_apdu(0x80, 0x12, 0x05, 0x00, le=0x04)
+APDU_ADD_256 = build_apdu(0x80, 0x17, 0x00, 0x00, struct.pack('>H', 256))
+APDU_SET_VALUE_1000 = build_apdu(0x80, 0x14, 0x00, 0x00, struct.pack('>I', 1000))
+APDU_SET_VALUE_42 = build_apdu(0x80, 0x14, 0x00, 0x00, struct.pack('>I', 42))
+APDU_SET_LIMIT_500 = build_apdu(0x80, 0x15, 0x01, 0x00, struct.pack('>I', 500))
+APDU_ECHO_TEST = build_apdu(0x80, 0x01, 0x00, 0x00, b"Test Echo Data")
+APDU_PUT_SECRET = build_apdu(0x80, 0x03, 0x00, 0x00, b"Donnees secretes!")
+APDU_PUT_SECRET1 = build_apdu(0x80, 0x03, 0x00, 0x00, b"Secret1")
+APDU_PUT_TEST = build_apdu(0x80, 0x03, 0x00, 0x00, b"test")
+APDU_VERIFY_PIN_0000 = build_apdu(0x80, 0x20, 0x00, 0x00, b"0000")
+APDU_VERIFY_PIN_9999 = build_apdu(0x80, 0x20, 0x00, 0x00, b"9999")
+APDU_BAD_CLA = build_apdu(0xFF, 0x00, 0x00, 0x00)
+APDU_BAD_INS = build_apdu(0x80, 0xFF, 0x00, 0x00)
+
 # =============================================================================
 # SCÉNARIOS DE TEST
 # =============================================================================
@@ -193,12 +296,12 @@ def build_apdu(cla, ins, p1, p2, data=None, le=None):
 def test_basic_select(card):
     """Test 1: Sélection basique d'applet"""
     print("\n" + "="*60)
-    print(colorize(" SCÉNARIO 1: Sélection d'Applet", Colors.HEADER + Colors.BOLD))
+    print(colorize(" SCÉNARIO 1: Sélection d'Applet", Colors.HEADER_BOLD))
     print("="*60)
 
     # Sélectionner HelloWorld
     print("\n--- Sélection de HelloWorld Applet ---")
-    apdu = build_select_apdu(AID_HELLOWORLD)
+    apdu = SELECT_HELLOWORLD
     data, sw = card.send_apdu(apdu, "SELECT HelloWorld (AID: F0000000010001)")
 
     if sw != b'\x90\x00':
@@ -211,141 +314,134 @@ def test_basic_select(card):
 def test_helloworld_commands(card):
     """Test 2: Commandes de l'applet HelloWorld"""
     print("\n" + "="*60)
-    print(colorize(" SCÉNARIO 2: Commandes HelloWorld Applet", Colors.HEADER + Colors.BOLD))
+    print(colorize(" SCÉNARIO 2: Commandes HelloWorld Applet", Colors.HEADER_BOLD))
     print("="*60)
 
     # S'assurer que HelloWorld est sélectionné
-    card.send_apdu(build_select_apdu(AID_HELLOWORLD), "SELECT HelloWorld")
+    card.send_apdu(SELECT_HELLOWORLD, "SELECT HelloWorld")
 
     # INS 00: Hello
     print("\n--- INS 00: GET HELLO ---")
-    apdu = build_apdu(0x80, 0x00, 0x00, 0x00, le=0x00)
+    apdu = APDU_GET_HELLO
     card.send_apdu(apdu, "Demande le message 'Hello World!'")
 
     # INS 01: Echo
     print("\n--- INS 01: ECHO ---")
-    test_data = b"Test Echo Data"
-    apdu = build_apdu(0x80, 0x01, 0x00, 0x00, test_data)
-    card.send_apdu(apdu, f"Echo des données: '{test_data.decode()}'")
+    apdu = APDU_ECHO_TEST
+    card.send_apdu(apdu, "Echo des données: 'Test Echo Data'")
 
     # INS F0: Get Status
     print("\n--- INS F0: GET STATUS ---")
-    apdu = build_apdu(0x80, 0xF0, 0x00, 0x00, le=0x08)
+    apdu = APDU_GET_STATUS
     data, sw = card.send_apdu(apdu, "Obtenir le statut de l'applet")
     if sw == b'\x90\x00' and len(data) >= 8:
         print(f"   Version: {data[0]}.{data[1]}")
-        usage = (data[2] << 8) | data[3]
+        usage = _U16.unpack_from(data, 2)[0]
         print(f"   Compteur d'utilisation: {usage}")
         print(f"   Essais PIN restants: {data[4]}")
         print(f"   PIN validé: {'Oui' if data[5] == 1 else 'Non'}")
-        data_len = (data[6] << 8) | data[7]
+        data_len = _U16.unpack_from(data, 6)[0]
         print(f"   Données stockées: {data_len} bytes")
 
     # INS 20: Verify PIN (correct)
     print("\n--- INS 20: VERIFY PIN (correct: 1234) ---")
-    pin = b"1234"
-    apdu = build_apdu(0x80, 0x20, 0x00, 0x00, pin)
+    apdu = APDU_VERIFY_PIN
     card.send_apdu(apdu, "Vérification du PIN '1234'")
 
     # INS 03: Put Data (nécessite PIN)
     print("\n--- INS 03: PUT DATA (après authentification) ---")
-    store_data = b"Donnees secretes!"
-    apdu = build_apdu(0x80, 0x03, 0x00, 0x00, store_data)
-    card.send_apdu(apdu, f"Stockage des données: '{store_data.decode()}'")
+    apdu = APDU_PUT_SECRET
+    card.send_apdu(apdu, "Stockage des données: 'Donnees secretes!'")
 
     # INS 02: Get Data
     print("\n--- INS 02: GET DATA ---")
-    apdu = build_apdu(0x80, 0x02, 0x00, 0x00, le=0x20)
+    apdu = APDU_GET_DATA
     card.send_apdu(apdu, "Lecture des données stockées")
 
     # INS 20: Verify PIN (incorrect)
     print("\n--- INS 20: VERIFY PIN (incorrect: 0000) ---")
-    bad_pin = b"0000"
-    apdu = build_apdu(0x80, 0x20, 0x00, 0x00, bad_pin)
+    apdu = APDU_VERIFY_PIN_0000
     card.send_apdu(apdu, "Vérification du PIN '0000' (doit échouer)")
 
 def test_counter_commands(card):
     """Test 3: Commandes de l'applet Counter"""
     print("\n" + "="*60)
-    print(colorize(" SCÉNARIO 3: Commandes Counter Applet", Colors.HEADER + Colors.BOLD))
+    print(colorize(" SCÉNARIO 3: Commandes Counter Applet", Colors.HEADER_BOLD))
     print("="*60)
 
     # Sélectionner Counter
     print("\n--- Sélection de Counter Applet ---")
-    card.send_apdu(build_select_apdu(AID_COUNTER), "SELECT Counter (AID: F0000000010002)")
+    card.send_apdu(SELECT_COUNTER, "SELECT Counter (AID: F0000000010002)")
 
     # INS 10: Get Counter (initial)
     print("\n--- INS 10: GET COUNTER (valeur initiale) ---")
-    apdu = build_apdu(0x80, 0x10, 0x00, 0x00, le=0x04)
+    apdu = APDU_GET_COUNTER
     data, sw = card.send_apdu(apdu, "Lecture du compteur")
     if sw == b'\x90\x00' and len(data) == 4:
-        value = int.from_bytes(data, 'big')
+        value = _U32.unpack(data)[0]
         print(f"   Valeur: {value}")
 
     # INS 11: Increment +1
     print("\n--- INS 11: INCREMENT (+1) ---")
-    apdu = build_apdu(0x80, 0x11, 0x00, 0x00, le=0x04)
+    apdu = APDU_INCREMENT_1
     data, sw = card.send_apdu(apdu, "Incrémentation de 1")
-    if sw == b'\x90\x00':
-        value = int.from_bytes(data, 'big')
+    if sw == b'\x90\x00' and len(data) == 4:
+        value = _U32.unpack(data)[0]
         print(f"   Nouvelle valeur: {value}")
 
     # INS 11: Increment +10
     print("\n--- INS 11: INCREMENT (+10) ---")
-    apdu = build_apdu(0x80, 0x11, 0x0A, 0x00, le=0x04)
+    apdu = APDU_INCREMENT_10
     data, sw = card.send_apdu(apdu, "Incrémentation de 10")
-    if sw == b'\x90\x00':
-        value = int.from_bytes(data, 'big')
+    if sw == b'\x90\x00' and len(data) == 4:
+        value = _U32.unpack(data)[0]
         print(f"   Nouvelle valeur: {value}")
 
     # INS 17: Add value (256)
     print("\n--- INS 17: ADD VALUE (+256) ---")
-    add_value = struct.pack('>H', 256)
-    apdu = build_apdu(0x80, 0x17, 0x00, 0x00, add_value)
+    apdu = APDU_ADD_256
     data, sw = card.send_apdu(apdu, "Ajout de 256")
-    if sw == b'\x90\x00':
-        value = int.from_bytes(data, 'big')
+    if sw == b'\x90\x00' and len(data) == 4:
+        value = _U32.unpack(data)[0]
         print(f"   Nouvelle valeur: {value}")
 
     # INS 12: Decrement -5
     print("\n--- INS 12: DECREMENT (-5) ---")
-    apdu = build_apdu(0x80, 0x12, 0x05, 0x00, le=0x04)
+    apdu = APDU_DECREMENT_5
     data, sw = card.send_apdu(apdu, "Décrémentation de 5")
-    if sw == b'\x90\x00':
-        value = int.from_bytes(data, 'big')
+    if sw == b'\x90\x00' and len(data) == 4:
+        value = _U32.unpack(data)[0]
         print(f"   Nouvelle valeur: {value}")
 
     # INS 14: Set Value (1000)
     print("\n--- INS 14: SET VALUE (1000) ---")
-    new_value = struct.pack('>I', 1000)
-    apdu = build_apdu(0x80, 0x14, 0x00, 0x00, new_value)
+    apdu = APDU_SET_VALUE_1000
     card.send_apdu(apdu, "Définition de la valeur à 1000")
 
     # INS 15: Set Limit (500) - activé
     print("\n--- INS 15: SET LIMIT (500, activé) ---")
-    limit_value = struct.pack('>I', 500)
-    apdu = build_apdu(0x80, 0x15, 0x01, 0x00, limit_value)
+    apdu = APDU_SET_LIMIT_500
     card.send_apdu(apdu, "Définition de la limite à 500 (activée)")
 
     # INS 11: Increment (doit échouer car > limite)
     print("\n--- INS 11: INCREMENT (doit échouer, > limite) ---")
-    apdu = build_apdu(0x80, 0x11, 0x01, 0x00, le=0x04)
+    apdu = APDU_INCREMENT_OVER_LIMIT
     card.send_apdu(apdu, "Tentative d'incrémentation (compteur=1000, limite=500)")
 
     # INS 13: Reset
     print("\n--- INS 13: RESET ---")
-    apdu = build_apdu(0x80, 0x13, 0x00, 0x00)
+    apdu = APDU_RESET_COUNTER
     card.send_apdu(apdu, "Remise à zéro du compteur")
 
     # INS 16: Get Info
     print("\n--- INS 16: GET INFO ---")
-    apdu = build_apdu(0x80, 0x16, 0x00, 0x00, le=0x0B)
+    apdu = APDU_GET_INFO
     data, sw = card.send_apdu(apdu, "Obtenir toutes les informations")
     if sw == b'\x90\x00' and len(data) >= 11:
-        counter = int.from_bytes(data[0:4], 'big')
-        limit = int.from_bytes(data[4:8], 'big')
+        counter = _U32.unpack_from(data, 0)[0]
+        limit = _U32.unpack_from(data, 4)[0]
         limit_enabled = data[8] == 1
-        op_count = (data[9] << 8) | data[10]
+        op_count = _U16.unpack_from(data, 9)[0]
         print(f"   Compteur: {counter}")
         print(f"   Limite: {limit}")
         print(f"   Limite activée: {'Oui' if limit_enabled else 'Non'}")
@@ -354,7 +450,7 @@ def test_counter_commands(card):
 def test_applet_switching(card):
     """Test 4: Changement de contexte entre applets"""
     print("\n" + "="*60)
-    print(colorize(" SCÉNARIO 4: Multi-Applets (Context Switching)", Colors.HEADER + Colors.BOLD))
+    print(colorize(" SCÉNARIO 4: Multi-Applets (Context Switching)", Colors.HEADER_BOLD))
     print("="*60)
 
     print("""
@@ -369,33 +465,33 @@ def test_applet_switching(card):
     print("\n" + "-"*40)
     print("ÉTAPE 1: Travailler avec HelloWorld")
     print("-"*40)
-    card.send_apdu(build_select_apdu(AID_HELLOWORLD), "SELECT HelloWorld")
-    card.send_apdu(build_apdu(0x80, 0x20, 0x00, 0x00, b"1234"), "VERIFY PIN")
-    card.send_apdu(build_apdu(0x80, 0x03, 0x00, 0x00, b"Secret1"), "PUT DATA 'Secret1'")
+    card.send_apdu(SELECT_HELLOWORLD, "SELECT HelloWorld")
+    card.send_apdu(APDU_VERIFY_PIN, "VERIFY PIN")
+    card.send_apdu(APDU_PUT_SECRET1, "PUT DATA 'Secret1'")
 
     # 2. Switch vers Counter
     print("\n" + "-"*40)
     print("ÉTAPE 2: Basculer vers Counter")
     print("-"*40)
-    card.send_apdu(build_select_apdu(AID_COUNTER), "SELECT Counter")
-    card.send_apdu(build_apdu(0x80, 0x14, 0x00, 0x00, struct.pack('>I', 42)), "SET VALUE 42")
-    apdu = build_apdu(0x80, 0x10, 0x00, 0x00, le=0x04)
+    card.send_apdu(SELECT_COUNTER, "SELECT Counter")
+    card.send_apdu(APDU_SET_VALUE_42, "SET VALUE 42")
+    apdu = APDU_GET_COUNTER
     data, sw = card.send_apdu(apdu, "GET COUNTER")
-    if sw == b'\x90\x00':
-        print(f"   ➜ Counter value: {int.from_bytes(data, 'big')}")
+    if sw == b'\x90\x00' and len(data) == 4:
+        print(f"   ➜ Counter value: {_U32.unpack(data)[0]}")
 
     # 3. Retour à HelloWorld
     print("\n" + "-"*40)
     print("ÉTAPE 3: Retour à HelloWorld")
     print("-"*40)
-    card.send_apdu(build_select_apdu(AID_HELLOWORLD), "SELECT HelloWorld")
+    card.send_apdu(SELECT_HELLOWORLD, "SELECT HelloWorld")
 
     # Note: après resélection, le PIN doit être revérifié!
     print("\n  Note: Le PIN doit être revérifié après resélection")
-    card.send_apdu(build_apdu(0x80, 0x02, 0x00, 0x00, le=0x20), "GET DATA (sans PIN)")
+    card.send_apdu(APDU_GET_DATA, "GET DATA (sans PIN)")
 
-    card.send_apdu(build_apdu(0x80, 0x20, 0x00, 0x00, b"1234"), "VERIFY PIN")
-    data, sw = card.send_apdu(build_apdu(0x80, 0x02, 0x00, 0x00, le=0x20), "GET DATA (avec PIN)")
+    card.send_apdu(APDU_VERIFY_PIN, "VERIFY PIN")
+    data, sw = card.send_apdu(APDU_GET_DATA, "GET DATA (avec PIN)")
     if sw == b'\x90\x00':
         print(f"   ➜ HelloWorld data: '{data.decode()}'")
 
@@ -403,54 +499,108 @@ def test_applet_switching(card):
     print("\n" + "-"*40)
     print("ÉTAPE 4: Vérifier la persistance de Counter")
     print("-"*40)
-    card.send_apdu(build_select_apdu(AID_COUNTER), "SELECT Counter")
-    data, sw = card.send_apdu(build_apdu(0x80, 0x10, 0x00, 0x00, le=0x04), "GET COUNTER")
-    if sw == b'\x90\x00':
-        print(f"   ➜ Counter value (persisté): {int.from_bytes(data, 'big')}")
+    card.send_apdu(SELECT_COUNTER, "SELECT Counter")
+    data, sw = card.send_apdu(APDU_GET_COUNTER, "GET COUNTER")
+    if sw == b'\x90\x00' and len(data) == 4:
+        print(f"   ➜ Counter value (persisté): {_U32.unpack(data)[0]}")
 
 def test_error_handling(card):
     """Test 5: Gestion des erreurs"""
     print("\n" + "="*60)
-    print(colorize(" SCÉNARIO 5: Gestion des Erreurs", Colors.HEADER + Colors.BOLD))
+    print(colorize(" SCÉNARIO 5: Gestion des Erreurs", Colors.HEADER_BOLD))
     print("="*60)
 
-    card.send_apdu(build_select_apdu(AID_HELLOWORLD), "SELECT HelloWorld")
+    card.send_apdu(SELECT_HELLOWORLD, "SELECT HelloWorld")
 
     # CLA non supporté
     print("\n--- Test: CLA non supporté ---")
-    apdu = build_apdu(0xFF, 0x00, 0x00, 0x00)
+    apdu = APDU_BAD_CLA
     card.send_apdu(apdu, "CLA 0xFF (non supporté)")
 
     # INS non supporté
     print("\n--- Test: INS non supporté ---")
-    apdu = build_apdu(0x80, 0xFF, 0x00, 0x00)
+    apdu = APDU_BAD_INS
     card.send_apdu(apdu, "INS 0xFF (non supporté)")
 
     # Données sans authentification
     print("\n--- Test: PUT DATA sans authentification PIN ---")
     # D'abord, désélectionner/resélectionner pour reset le PIN
-    card.send_apdu(build_select_apdu(AID_COUNTER), "SELECT Counter (pour reset)")
-    card.send_apdu(build_select_apdu(AID_HELLOWORLD), "SELECT HelloWorld (PIN reset)")
-    apdu = build_apdu(0x80, 0x03, 0x00, 0x00, b"test")
+    card.send_apdu(SELECT_COUNTER, "SELECT Counter (pour reset)")
+    card.send_apdu(SELECT_HELLOWORLD, "SELECT HelloWorld (PIN reset)")
+    apdu = APDU_PUT_TEST
     card.send_apdu(apdu, "PUT DATA sans PIN (doit échouer)")
 
     # PIN incorrect (multiple fois)
     print("\n--- Test: PIN incorrect (essais multiples) ---")
+    apdu = APDU_VERIFY_PIN_9999
     for i in range(2):
-        apdu = build_apdu(0x80, 0x20, 0x00, 0x00, b"9999")
         card.send_apdu(apdu, f"Tentative {i+1}: PIN '9999' (incorrect)")
 
+async def stress_echo(card, count):
+    """Boucle ECHO sur HelloWorld ; retourne le nombre de réponses incorrectes
+
+    Seules des commandes sans effet sur l'état de la carte sont utilisées :
+    les connexions partagent la même carte simulée.
+    """
+    errors = 0
+    data, sw = await card.send_apdu(SELECT_HELLOWORLD)
+    if sw != b'\x90\x00':
+        return count
+
+    for i in range(count):
+        payload = i.to_bytes(4, 'big')
+        data, sw = await card.send_apdu(build_apdu(0x80, 0x01, 0x00, 0x00, payload))
+        if sw != b'\x90\x00' or data != payload:
+            errors += 1
+    return errors
+
+async def run_stress(host, port, connections, count):
+    """Exécute stress_echo sur plusieurs connexions concurrentes"""
+    print(f"Stress: {connections} connexions x {count} ECHO sur {host}:{port}")
+
+    cards = [AsyncSmartCardConnection(host, port) for _ in range(connections)]
+    await asyncio.gather(*(card.connect() for card in cards))
+
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(stress_echo(card, count) for card in cards))
+        elapsed = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*(card.disconnect() for card in cards))
+
+    total = connections * (count + 1)
+    errors = sum(results)
+    color = Colors.GREEN if errors == 0 else Colors.RED
+    print(colorize(f"✓ {total} APDUs en {elapsed:.3f} s ({total / elapsed:.0f} APDU/s), "
+                   f"{errors} erreur(s)", color))
+    return errors
+
 # =============================================================================
 # MAIN
 # =============================================================================
 
 def main():
+    parser = argparse.ArgumentParser(description="Scénarios de test APDU multi-applets")
+    parser.add_argument('--stress', type=int, metavar='N',
+                        help="N connexions concurrentes en boucle ECHO au lieu des scénarios")
+    parser.add_argument('--count', type=int, default=100,
+                        help="Nombre d'ECHO par connexion en mode --stress (défaut: 100)")
+    args = parser.parse_args()
+
+    if args.stress:
+        try:
+            errors = asyncio.run(run_stress(JCARDSIM_HOST, JCARDSIM_PORT, args.stress, args.count))
+        except OSError as e:
+            print(colorize(f"\n✗ Impossible de se connecter à jCardSim sur {JCARDSIM_HOST}:{JCARDSIM_PORT}: {e}", Colors.RED))
+            sys.exit(1)
+        sys.exit(1 if errors else 0)
+
     print(colorize("""
     ╔═══════════════════════════════════════════════════════════╗
     ║       TEST COMPLET DES COMMANDES APDU                     ║
     ║       Scénario Multi-Applets JavaCard                     ║
     ╚═══════════════════════════════════════════════════════════╝
-    """, Colors.HEADER + Colors.BOLD))
+    """, Colors.HEADER_BOLD))
 
     print(f"Connexion à jCardSim sur {JCARDSIM_HOST}:{JCARDSIM_PORT}...")
 
@@ -459,23 +609,16 @@ def main():
     try:
         card.connect()
 
-        # Exécuter tous les scénarios
+        # Exécuter tous les scénarios, à la suite : ils partagent la même
+        # carte simulée (applet sélectionnée, PIN validé, valeur du compteur)
         test_basic_select(card)
-        time.sleep(0.5)
-
         test_helloworld_commands(card)
-        time.sleep(0.5)
-
         test_counter_commands(card)
-        time.sleep(0.5)
-
         test_applet_switching(card)
-        time.sleep(0.5)
-
         test_error_handling(card)
 
         print("\n" + "="*60)
-        print(colorize(" TOUS LES TESTS TERMINÉS", Colors.GREEN + Colors.BOLD))
+        print(colorize(" TOUS LES TESTS TERMINÉS", Colors.GREEN_BOLD))
         print("="*60)
 
     except ConnectionRefusedError:
@@ -13,7 +13,7 @@ import os
 import socket
 import struct
 import sys
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Union
 
 # Configuration
 JCARDSIM_HOST = os.getenv('JCARDSIM_HOST', 'localhost')
@@ -21,12 +21,19 @@ JCARDSIM_PORT = int(os.getenv('JCARDSIM_PORT', '9025'))
 
 # AID de l'applet HelloWorld
 APPLET_AID = "F0000000010001"
+SELECT_APPLET_APDU = bytes.fromhex(f"00A4040007{APPLET_AID}")
 
 # Codes de statut courants
 SW_OK = bytes.fromhex("9000")
 SW_SECURITY_NOT_SATISFIED = bytes.fromhex("6982")
 SW_CONDITIONS_NOT_SATISFIED = bytes.fromhex("6985")
 
+# Taille du buffer de réception (plus grande trame possible : 2 + 65535)
+RX_BUFSIZE = 2 + 0xFFFF
+
+# Décodage des entiers 16 bits big-endian des réponses
+_U16 = struct.Struct('>H')
+
 # Couleurs pour le terminal
 class Colors:
     GREEN = '\033[92m'
@@ -52,6 +59,14 @@ class APDUTester:
         self.verbose = verbose
         self.socket: Optional[socket.socket] = None
         self.results: List[TestResult] = []
+        # Buffer de réception : un seul recv_into ramène en général
+        # l'en-tête et le corps de la réponse
+        self._rx = bytearray(RX_BUFSIZE)
+        self._rx_view = memoryview(self._rx)
+        self._rx_start = 0
+        self._rx_end = 0
+        # Buffer d'émission : longueur + APDU écrits en place, sans concaténation
+        self._tx = bytearray(RX_BUFSIZE)
     
     def connect(self) -> bool:
         """Établit la connexion."""
@@ -59,6 +74,11 @@ class APDUTester:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.settimeout(10)
             self.socket.connect((self.host, self.port))
+            # Petits échanges requête/réponse : désactiver Nagle
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+            self._rx_start = self._rx_end = 0
             if self.verbose:
                 print(f"{Colors.GREEN}✓ Connected to {self.host}:{self.port}{Colors.END}")
             return True
@@ -72,26 +92,59 @@ class APDUTester:
             self.socket.close()
             self.socket = None
     
-    def send_apdu(self, apdu_hex: str) -> Tuple[bytes, bytes]:
+    def send_apdu(self, apdu_hex: Union[str, bytes]) -> Tuple[bytes, bytes]:
         """
-        Envoie un APDU et retourne (data, sw).
+        Envoie un APDU (hex ou bytes déjà construits) et retourne (data, sw).
         """
-        apdu = bytes.fromhex(apdu_hex.replace(' ', ''))
+        if isinstance(apdu_hex, bytes):
+            apdu = apdu_hex
+        else:
+            apdu = bytes.fromhex(apdu_hex.replace(' ', ''))
         
         if self.verbose:
             print(f"  → {apdu.hex().upper()}")
         
         # Envoyer
-        length = struct.pack('>H', len(apdu))
-        self.socket.sendall(length + apdu)
+        n = self._put_frame(0, apdu)
+        self.socket.sendall(memoryview(self._tx)[:n])
+        
+        return self._read_response()
+    
+    def send_apdu_batch(self, apdus_hex: List[Union[str, bytes]]) -> List[Tuple[bytes, bytes]]:
+        """
+        Envoie plusieurs APDUs en un seul sendall et retourne leurs (data, sw).
         
-        # Recevoir la longueur
-        resp_len = struct.unpack('>H', self.socket.recv(2))[0]
+        jCardSim traite les trames dans l'ordre de réception : les réponses
+        arrivent dans l'ordre des APDUs, et une séquence dépendante (SELECT
+        puis commandes) peut être envoyée en un seul lot.
+        """
+        apdus = [apdu_hex if isinstance(apdu_hex, bytes) else bytes.fromhex(apdu_hex.replace(' ', ''))
+                 for apdu_hex in apdus_hex]
         
-        # Recevoir la réponse
-        response = b''
-        while len(response) < resp_len:
-            response += self.socket.recv(resp_len - len(response))
+        total = sum(2 + len(apdu) for apdu in apdus)
+        if total > len(self._tx):
+            self._tx = bytearray(total)
+        
+        offset = 0
+        for apdu in apdus:
+            if self.verbose:
+                print(f"  → {apdu.hex().upper()}")
+            offset = self._put_frame(offset, apdu)
+        
+        self.socket.sendall(memoryview(self._tx)[:offset])
+        
+        return [self._read_response() for _ in apdus_hex]
+    
+    def _put_frame(self, offset: int, apdu: bytes) -> int:
+        """Écrit longueur + APDU dans le buffer d'émission, retourne la fin."""
+        struct.pack_into('>H', self._tx, offset, len(apdu))
+        end = offset + 2 + len(apdu)
+        self._tx[offset + 2:end] = apdu
+        return end
+    
+    def _read_response(self) -> Tuple[bytes, bytes]:
+        """Lit une réponse et la sépare en (data, sw)."""
+        response = self._read_frame()
         
         # Séparer data et SW
         data = response[:-2] if len(response) > 2 else b''
@@ -104,6 +157,34 @@ class APDUTester:
         
         return data, sw
     
+    def _read_frame(self) -> bytes:
+        """Lit une réponse préfixée de sa longueur depuis le buffer de réception."""
+        self._fill(2)
+        resp_len = struct.unpack_from('>H', self._rx, self._rx_start)[0]
+        self._fill(2 + resp_len)
+        
+        start = self._rx_start + 2
+        self._rx_start = start + resp_len
+        return bytes(self._rx_view[start:self._rx_start])
+    
+    def _fill(self, length: int):
+        """S'assure qu'au moins 'length' bytes sont disponibles dans le buffer."""
+        if self._rx_end - self._rx_start >= length:
+            return
+        
+        # Ramener les bytes restants en tête du buffer
+        if self._rx_start:
+            pending = self._rx_end - self._rx_start
+            self._rx[:pending] = self._rx_view[self._rx_start:self._rx_end]
+            self._rx_start = 0
+            self._rx_end = pending
+        
+        while self._rx_end < length:
+            n = self.socket.recv_into(self._rx_view[self._rx_end:])
+            if not n:
+                raise ConnectionError("Connection closed by jCardSim")
+            self._rx_end += n
+    
     def record_result(self, name: str, passed: bool, message: str = ""):
         """Enregistre un résultat de test."""
         self.results.append(TestResult(name, passed, message))
@@ -141,8 +222,7 @@ def test_select_applet(tester: APDUTester) -> bool:
     print(f"\n{Colors.CYAN}=== Test: Select Applet ==={Colors.END}")
     
     # SELECT avec AID
-    apdu = f"00A4040007{APPLET_AID}"
-    data, sw = tester.send_apdu(apdu)
+    data, sw = tester.send_apdu(SELECT_APPLET_APDU)
     
     return tester.assert_sw(sw, SW_OK, "Select applet by AID")
 
@@ -151,11 +231,9 @@ def test_hello_world(tester: APDUTester) -> bool:
     """Test: Commande Hello World."""
     print(f"\n{Colors.CYAN}=== Test: Hello World ==={Colors.END}")
     
-    # Sélectionner l'applet d'abord
-    tester.send_apdu(f"00A4040007{APPLET_AID}")
-    
-    # Commande HELLO (CLA=80, INS=00)
-    data, sw = tester.send_apdu("80000000")
+    # Sélectionner l'applet puis commande HELLO (CLA=80, INS=00), envoyés
+    # ensemble : jCardSim les traite dans l'ordre
+    _, (data, sw) = tester.send_apdu_batch([SELECT_APPLET_APDU, "80000000"])
     
     expected = b"Hello World!"
     
@@ -170,7 +248,7 @@ def test_echo(tester: APDUTester) -> bool:
     print(f"\n{Colors.CYAN}=== Test: Echo ==={Colors.END}")
     
     # Sélectionner l'applet
-    tester.send_apdu(f"00A4040007{APPLET_AID}")
+    tester.send_apdu(SELECT_APPLET_APDU)
     
     # Test avec différentes données
     test_cases = [
@@ -179,12 +257,15 @@ def test_echo(tester: APDUTester) -> bool:
         ("41424344", "ASCII 'ABCD'"),
     ]
     
-    all_passed = True
+    # Les cas sont indépendants : un seul envoi pour tous les APDUs
+    apdus = []
     for test_data, description in test_cases:
         lc = f"{len(test_data)//2:02X}"
-        apdu = f"8001000{lc}{test_data}{lc}"
-        data, sw = tester.send_apdu(apdu)
-        
+        apdus.append(f"80010000{lc}{test_data}{lc}")
+    responses = tester.send_apdu_batch(apdus)
+    
+    all_passed = True
+    for (test_data, description), (data, sw) in zip(test_cases, responses):
         expected = bytes.fromhex(test_data)
         passed = sw == SW_OK and data == expected
         tester.record_result(f"Echo {description}", passed)
@@ -197,20 +278,20 @@ def test_pin_verification(tester: APDUTester) -> bool:
     """Test: Vérification du PIN."""
     print(f"\n{Colors.CYAN}=== Test: PIN Verification ==={Colors.END}")
     
-    # Sélectionner l'applet
-    tester.send_apdu(f"00A4040007{APPLET_AID}")
-    
-    # Test avec PIN incorrect
+    # Sélectionner l'applet, puis PIN incorrect et PIN correct
+    # (par défaut: "1234") : la séquence part en un seul envoi
     wrong_pin = "30303030"  # "0000"
-    data, sw = tester.send_apdu(f"80200004{wrong_pin}")
+    correct_pin = "31323334"  # "1234"
+    _, (_, wrong_sw), (_, sw) = tester.send_apdu_batch([
+        SELECT_APPLET_APDU,
+        f"80200004{wrong_pin}",
+        f"80200004{correct_pin}",
+    ])
     
     # Devrait retourner 63 Cx (x = essais restants)
-    wrong_pin_ok = sw[0] == 0x63 and (sw[1] & 0xF0) == 0xC0
+    wrong_pin_ok = wrong_sw[0] == 0x63 and (wrong_sw[1] & 0xF0) == 0xC0
     tester.record_result("Wrong PIN rejected", wrong_pin_ok)
     
-    # Test avec PIN correct (par défaut: "1234")
-    correct_pin = "31323334"  # "1234"
-    data, sw = tester.send_apdu(f"80200004{correct_pin}")
     correct_pin_ok = tester.assert_sw(sw, SW_OK, "Correct PIN accepted")
     
     return wrong_pin_ok and correct_pin_ok
@@ -220,23 +301,21 @@ def test_data_storage(tester: APDUTester) -> bool:
     """Test: Stockage de données."""
     print(f"\n{Colors.CYAN}=== Test: Data Storage ==={Colors.END}")
     
-    # Sélectionner l'applet
-    tester.send_apdu(f"00A4040007{APPLET_AID}")
-    
-    # Essayer de stocker sans authentification
+    # Sélection, PUT_DATA sans authentification, PIN, PUT_DATA puis
+    # GET_DATA : séquence ordonnée envoyée en un seul lot
     test_data = "48656C6C6F"  # "Hello"
-    data, sw = tester.send_apdu(f"8003000505{test_data}")
-    no_auth_rejected = tester.assert_sw(sw, SW_SECURITY_NOT_SATISFIED, "PUT_DATA without PIN rejected")
-    
-    # Authentifier avec PIN
-    tester.send_apdu("8020000431323334")
+    _, (_, no_auth_sw), _, (_, put_sw), (data, sw) = tester.send_apdu_batch([
+        SELECT_APPLET_APDU,
+        f"8003000505{test_data}",
+        "8020000431323334",
+        f"8003000505{test_data}",
+        "80020000",
+    ])
     
-    # Stocker des données
-    data, sw = tester.send_apdu(f"8003000505{test_data}")
-    put_ok = tester.assert_sw(sw, SW_OK, "PUT_DATA with PIN")
+    no_auth_rejected = tester.assert_sw(no_auth_sw, SW_SECURITY_NOT_SATISFIED, "PUT_DATA without PIN rejected")
+    put_ok = tester.assert_sw(put_sw, SW_OK, "PUT_DATA with PIN")
     
     # Lire les données
-    data, sw = tester.send_apdu("80020000")
     get_ok = sw == SW_OK and data == bytes.fromhex(test_data)
     tester.record_result("GET_DATA returns stored data", get_ok)
     
@@ -247,21 +326,18 @@ def test_status(tester: APDUTester) -> bool:
     """Test: Commande Status."""
     print(f"\n{Colors.CYAN}=== Test: Get Status ==={Colors.END}")
     
-    # Sélectionner l'applet
-    tester.send_apdu(f"00A4040007{APPLET_AID}")
-    
-    # Obtenir le statut
-    data, sw = tester.send_apdu("80F00000")
+    # Sélectionner l'applet et obtenir le statut
+    _, (data, sw) = tester.send_apdu_batch([SELECT_APPLET_APDU, "80F00000"])
     
     status_ok = sw == SW_OK and len(data) >= 8
     tester.record_result("Get status command", status_ok)
     
     if status_ok and tester.verbose:
         version = f"{data[0]}.{data[1]}"
-        counter = int.from_bytes(data[2:4], 'big')
+        counter = _U16.unpack_from(data, 2)[0]
         pin_tries = data[4]
         pin_validated = data[5]
-        data_len = int.from_bytes(data[6:8], 'big')
+        data_len = _U16.unpack_from(data, 6)[0]
         
         print(f"    Version: {version}")
         print(f"    Usage counter: {counter}")
@@ -284,12 +360,11 @@ def run_all_tests(tester: APDUTester) -> bool:
         return False
     
     try:
-        test_select_applet(tester)
-        test_hello_world(tester)
-        test_echo(tester)
-        test_pin_verification(tester)
-        test_data_storage(tester)
-        test_status(tester)
+        for test in (test_select_applet, test_hello_world, test_echo,
+                     test_pin_verification, test_data_storage, test_status):
+            test(tester)
+            # Une écriture sur stdout par test (voir main)
+            sys.stdout.flush()
     finally:
         tester.disconnect()
     
@@ -324,6 +399,10 @@ def main():
     
     args = parser.parse_args()
     
+    # En mode verbeux chaque APDU produit plusieurs lignes : sortie bufferisée
+    # même sur un terminal, vidée après chaque test par run_all_tests
+    sys.stdout.reconfigure(line_buffering=False)
+    
     tester = APDUTester(args.host, args.port, args.verbose)
     
     if args.test:
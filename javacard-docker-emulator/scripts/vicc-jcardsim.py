@@ -16,10 +16,19 @@ JCARDSIM_HOST = os.getenv('JCARDSIM_HOST', 'jcardsim')
 JCARDSIM_PORT = int(os.getenv('JCARDSIM_PORT', '9025'))
 VPCD_HOST = os.getenv('VPCD_HOST', 'localhost')
 VPCD_PORT = int(os.getenv('VPCD_PORT', '35963'))
+# Maximum time (seconds) to wait for VPCD at startup
+VPCD_CONNECT_TIMEOUT = float(os.getenv('VPCD_CONNECT_TIMEOUT', '120'))
 
 # Standard ATR for jCardSim
 ATR = bytes.fromhex('3B6800000073C84012009000')
 
+# Receive buffer for jCardSim responses and transmit buffer for outgoing
+# frames, both sized for the largest frame (2 + 65535 bytes)
+_RX_BUF = bytearray(2 + 0xFFFF)
+_RX_VIEW = memoryview(_RX_BUF)
+_TX_BUF = bytearray(2 + 0xFFFF)
+_TX_VIEW = memoryview(_TX_BUF)
+
 # VPCD Commands
 CYCLIC_POWER_OFF = 0x00
 CYCLIC_RESET = 0x01
@@ -27,49 +36,150 @@ CYCLIC_GET_ATR = 0x02
 CYCLIC_APDU = 0x03
 
 
+def tune_socket(sock):
+    """Disable Nagle and size the socket buffers for APDU exchanges.
+
+    Both links carry small request/response frames: without TCP_NODELAY a
+    frame can wait for the peer's delayed ACK.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+
+
 def connect_jcardsim():
     """Connect to jCardSim."""
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.settimeout(10)
     sock.connect((JCARDSIM_HOST, JCARDSIM_PORT))
+    tune_socket(sock)
     print(f"[VICC] Connected to jCardSim at {JCARDSIM_HOST}:{JCARDSIM_PORT}")
     return sock
 
 
+def connect_vpcd():
+    """Connect to VPCD, retrying until VPCD_CONNECT_TIMEOUT expires.
+
+    Retries start at 50 ms and back off to 1 s, so the relay attaches as
+    soon as VPCD is listening instead of on a fixed 2-second grid.
+    """
+    deadline = time.monotonic() + VPCD_CONNECT_TIMEOUT
+    delay = 0.05
+    attempt = 0
+    next_report = 0.0
+
+    while True:
+        attempt += 1
+        try:
+            vpcd = socket.create_connection((VPCD_HOST, VPCD_PORT), timeout=10)
+            tune_socket(vpcd)
+            print(f"[VICC] Connected to VPCD!")
+            return vpcd
+        except Exception as e:
+            now = time.monotonic()
+            if now >= deadline:
+                print(f"[VICC] Giving up on VPCD after {attempt} attempts - {e}")
+                return None
+            if now >= next_report:
+                print(f"[VICC] Waiting for VPCD... (attempt {attempt}) - {e}")
+                next_report = now + 10
+            time.sleep(min(delay, deadline - now))
+            delay = min(delay * 2, 1.0)
+
+
+def send_frame(sock, payload):
+    """Send a 2-byte length (big-endian) + payload frame.
+
+    The frame is assembled in the shared transmit buffer, so no new bytes
+    object is created per call.
+    """
+    n = len(payload)
+    struct.pack_into('>H', _TX_BUF, 0, n)
+    _TX_BUF[2:2 + n] = payload
+    sock.sendall(_TX_VIEW[:2 + n])
+
+
 def send_apdu_to_jcardsim(jc_sock, apdu):
-    """Send APDU to jCardSim and return response."""
+    """Send APDU to jCardSim and return response.
+
+    The response is a view into the shared receive buffer, valid until the
+    next call.
+    """
     # jCardSim protocol: 2 bytes length (big-endian) + APDU
-    length = struct.pack('>H', len(apdu))
-    jc_sock.sendall(length + apdu)
+    send_frame(jc_sock, apdu)
 
-    # Read response: 2 bytes length + response
-    resp_len_bytes = jc_sock.recv(2)
-    if not resp_len_bytes:
+    # Read response: 2 bytes length + response. A single recv_into
+    # usually returns both the header and the body.
+    got = jc_sock.recv_into(_RX_VIEW)
+    if not got:
         return b'\x6F\x00'  # General error
-
-    resp_len = struct.unpack('>H', resp_len_bytes)[0]
-    response = b''
-    while len(response) < resp_len:
-        chunk = jc_sock.recv(resp_len - len(response))
-        if not chunk:
+    while got < 2:
+        n = jc_sock.recv_into(_RX_VIEW[got:])
+        if not n:
+            return b'\x6F\x00'
+        got += n
+
+    end = 2 + struct.unpack_from('>H', _RX_BUF)[0]
+    while got < end:
+        n = jc_sock.recv_into(_RX_VIEW[got:end])
+        if not n:
             break
-        response += chunk
+        got += n
 
-    return response
+    return _RX_VIEW[2:min(got, end)]
 
 
-def recv_exact(sock, n):
-    """Receive exactly n bytes."""
-    data = b''
-    while len(data) < n:
-        try:
-            chunk = sock.recv(n - len(data))
-            if not chunk:
-                return None
-            data += chunk
-        except socket.timeout:
+class FrameReader:
+    """Buffered reader for length-prefixed VPCD frames.
+
+    One recv_into usually brings in the length header and the command
+    together (often several commands), instead of two recv calls each.
+    Frames are returned as views into the buffer, valid until the next
+    read_frame() call, so relaying an APDU copies nothing in Python.
+    """
+
+    def __init__(self, sock, size=4096):
+        self.sock = sock
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0
+        self.end = 0
+
+    def read_frame(self):
+        """Return a view of the next frame payload, or None if the peer closed."""
+        if not self._fill(2):
             return None
-    return data
+        length = struct.unpack_from('>H', self.buf, self.start)[0]
+        if not self._fill(2 + length):
+            return None
+
+        begin = self.start + 2
+        self.start = begin + length
+        return self.view[begin:self.start]
+
+    def _fill(self, n):
+        """Make sure at least n bytes are buffered."""
+        if self.end - self.start >= n:
+            return True
+
+        # Move the pending bytes to the front (and grow for large frames)
+        pending = self.end - self.start
+        if n > len(self.buf):
+            buf = bytearray(n)
+            buf[:pending] = self.view[self.start:self.end]
+            self.buf = buf
+            self.view = memoryview(buf)
+        elif self.start:
+            self.buf[:pending] = self.view[self.start:self.end]
+        self.start = 0
+        self.end = pending
+
+        while self.end < n:
+            nbytes = self.sock.recv_into(self.view[self.end:])
+            if not nbytes:
+                return False
+            self.end += nbytes
+        return True
 
 
 def main():
@@ -83,19 +193,7 @@ def main():
     # Try to connect to VPCD
     print(f"[VICC] Connecting to VPCD at {VPCD_HOST}:{VPCD_PORT}...")
 
-    vpcd = None
-    for attempt in range(60):
-        try:
-            vpcd = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            vpcd.settimeout(10)
-            vpcd.connect((VPCD_HOST, VPCD_PORT))
-            print(f"[VICC] Connected to VPCD!")
-            break
-        except Exception as e:
-            if attempt % 5 == 0:
-                print(f"[VICC] Waiting for VPCD... ({attempt+1}/60) - {e}")
-            time.sleep(2)
-            vpcd = None
+    vpcd = connect_vpcd()
 
     if not vpcd:
         print("[VICC] Failed to connect to VPCD")
@@ -104,48 +202,39 @@ def main():
     jc_sock = None
     card_powered = False
 
+    reader = FrameReader(vpcd)
+
     print("[VICC] Virtual card ready, waiting for commands...")
 
     while True:
         try:
-            # Read command length from VPCD (2 bytes, big-endian)
-            length_bytes = recv_exact(vpcd, 2)
-            if not length_bytes:
+            # Read command frame from VPCD (2 bytes length, big-endian + data)
+            data = reader.read_frame()
+            if data is None:
                 print("[VICC] VPCD connection closed")
                 break
 
-            length = struct.unpack('>H', length_bytes)[0]
-            if length == 0:
-                continue
-
-            # Read command data
-            data = recv_exact(vpcd, length)
             if not data:
-                print("[VICC] Failed to read command data")
-                break
+                continue
 
             cmd = data[0]
             response = None
 
             # Process VPCD command
+            # The jCardSim connection is kept across power cycles and resets:
+            # the server holds a single simulator whose state does not depend
+            # on the connection, so reconnecting would only cost a handshake.
             if cmd == CYCLIC_POWER_OFF:
                 print("[VICC] Power OFF")
                 card_powered = False
-                if jc_sock:
-                    try:
-                        jc_sock.close()
-                    except:
-                        pass
-                    jc_sock = None
                 response = b'\x00'  # Success
 
             elif cmd == CYCLIC_RESET:
                 print("[VICC] Reset")
                 card_powered = True
                 try:
-                    if jc_sock:
-                        jc_sock.close()
-                    jc_sock = connect_jcardsim()
+                    if not jc_sock:
+                        jc_sock = connect_jcardsim()
                     response = b'\x00'  # Success
                 except Exception as e:
                     print(f"[VICC] Reset failed: {e}")
@@ -155,10 +244,11 @@ def main():
                 print(f"[VICC] Get ATR -> {ATR.hex().upper()}")
                 if not card_powered:
                     card_powered = True
-                    try:
-                        jc_sock = connect_jcardsim()
-                    except Exception as e:
-                        print(f"[VICC] Connection to jCardSim failed: {e}")
+                    if not jc_sock:
+                        try:
+                            jc_sock = connect_jcardsim()
+                        except Exception as e:
+                            print(f"[VICC] Connection to jCardSim failed: {e}")
                 response = ATR
 
             elif cmd == CYCLIC_APDU:
@@ -171,9 +261,7 @@ def main():
                         jc_sock = connect_jcardsim()
                     except Exception as e:
                         print(f"[VICC] Connection failed: {e}")
-                        response = b'\x6F\x00'
-                        resp_length = struct.pack('>H', len(response))
-                        vpcd.sendall(resp_length + response)
+                        send_frame(vpcd, b'\x6F\x00')
                         continue
 
                 # Send APDU to jCardSim
@@ -182,6 +270,7 @@ def main():
                     print(f"[VICC] Response: {response.hex().upper()}")
                 except Exception as e:
                     print(f"[VICC] APDU error: {e}")
+                    jc_sock.close()
                     jc_sock = None
                     response = b'\x6F\x00'
 
@@ -191,8 +280,7 @@ def main():
 
             # Send response to VPCD
             if response is not None:
-                resp_length = struct.pack('>H', len(response))
-                vpcd.sendall(resp_length + response)
+                send_frame(vpcd, response)
 
         except socket.timeout:
             continue
@@ -10,16 +10,26 @@ Protocole VPCD:
 - Le proxy répond aux commandes VPCD (power on/off, ATR, APDU)
 - Les APDUs sont transmis à jCardSim
 
+Deux variantes de messages VPCD (2 bytes big-endian de longueur + données),
+choisies par VPCD_PROTOCOL :
+- control (défaut) : un message de 1 byte est une commande de contrôle
+  (0 off, 1 on, 2 reset, 4 ATR), un message plus long est un APDU
+- cyclic : le premier byte est la commande (0 off, 1 reset, 2 ATR,
+  3 + APDU, 4 présence carte) ; utilisé par vpcd-proxy.py
+
 Protocole jCardSim:
 - 2 bytes big-endian pour la longueur
 - Puis les données APDU
 """
 
+import abc
+import logging
 import os
+import selectors
+import signal
 import socket
 import struct
 import sys
-import threading
 import time
 
 # Force unbuffered output
@@ -31,18 +41,80 @@ VPCD_PORT = int(os.getenv('VPCD_PORT', '35963'))
 JCARDSIM_HOST = os.getenv('JCARDSIM_HOST', 'jcardsim')
 JCARDSIM_PORT = int(os.getenv('JCARDSIM_PORT', '9025'))
 
+# Variante du protocole VPCD : 'control' ou 'cyclic' (voir ci-dessus)
+VPCD_PROTOCOL = os.getenv('VPCD_PROTOCOL', 'control').lower()
+
+# Traces par APDU/commande (désactivées par défaut : hors du chemin critique)
+DEBUG = bool(os.getenv('VPCD_DEBUG'))
+
+# Cœur CPU sur lequel épingler la boucle (optionnel, Linux)
+VPCD_CPU = os.getenv('VPCD_CPU')
+
+log = logging.getLogger('vpcd')
+
 # Commandes VPCD (protocole vsmartcard)
 VPCD_CTRL_OFF = 0
 VPCD_CTRL_ON = 1
 VPCD_CTRL_RESET = 2
 VPCD_CTRL_ATR = 4
 
+# Commandes VPCD, variante cyclic (premier byte du message)
+CYCLIC_POWER_OFF = 0x00
+CYCLIC_RESET = 0x01
+CYCLIC_GET_ATR = 0x02
+CYCLIC_APDU = 0x03
+CYCLIC_CARD_PRESENT = 0x04  # Card present check
+
+# Longueur des trames (2 bytes big-endian), format compilé une fois
+_U16 = struct.Struct('>H')
+
 # ATR par défaut - ATR simple T=0
 # Format: 3B [T0] [historical bytes...]
 # 3B = TS (direct convention)
 # 00 = T0 (no interface bytes, no historical bytes) = T=0 protocol
 # Simple et compatible avec vpcd
 DEFAULT_ATR = bytes.fromhex('3B00')
+# Trame de réponse ATR complète (longueur + ATR)
+_ATR_FRAME = _U16.pack(len(DEFAULT_ATR)) + DEFAULT_ATR
+
+# ATR de la variante cyclic - supporte T=1
+# ATR de carte SIM standard supportant T=0: 3B 9F 95 80 1F C3 80 31 E0 73 FE 21 13 57 86 81 02 86 98
+# ATR minimaliste T=1: 3B 80 01 - TS=3B, T0=80 (TD1 present), TD1=01 (T=1)
+CYCLIC_ATR = bytes.fromhex('3B8001')
+# Trame de réponse ATR complète (longueur + ATR) et sa forme pour les logs
+_CYCLIC_ATR_FRAME = _U16.pack(len(CYCLIC_ATR)) + CYCLIC_ATR
+_CYCLIC_ATR_HEX = CYCLIC_ATR.hex().upper()
+
+# Taille maximale d'une trame : longueur (2 bytes) + 65535 bytes
+FRAME_BUFSIZE = 2 + 0xFFFF
+
+# Keepalive TCP sur les connexions VPCD : détecte un driver disparu sans
+# délai d'inactivité côté Python (le sélecteur ne réveille qu'à la lecture)
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+
+def _set_keepalive(sock):
+    """Active le keepalive TCP pour détecter rapidement un pair disparu."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Options propres à Linux : ignorées si la plateforme ne les expose pas
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+
+
+def send_frame(sock, buf, payload):
+    """Envoie longueur (2 bytes big-endian) + payload en un seul sendall.
+
+    La trame est assemblée dans 'buf' (bytearray de FRAME_BUFSIZE bytes
+    réutilisé par l'appelant), sans concaténation.
+    """
+    n = len(payload)
+    _U16.pack_into(buf, 0, n)
+    buf[2:2 + n] = payload
+    sock.sendall(memoryview(buf)[:2 + n])
 
 
 class JCardSimClient:
@@ -52,21 +124,35 @@ class JCardSimClient:
         self.host = host
         self.port = port
         self.socket = None
-        self.lock = threading.Lock()
+        # Tampons d'émission et de réception réutilisés. Pas de verrou :
+        # toutes les connexions VPCD sont servies par un seul thread
+        self._tx = bytearray(FRAME_BUFSIZE)
+        self._rx = bytearray(FRAME_BUFSIZE)
+        self._rx_view = memoryview(self._rx)
+        self._rx_start = 0
+        self._rx_end = 0
 
     def connect(self):
-        """Se connecte à jCardSim."""
+        """Se connecte à jCardSim (en fermant une connexion existante)."""
+        self.disconnect()
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.settimeout(10)
             self.socket.connect((self.host, self.port))
-            print(f"Connected to jCardSim at {self.host}:{self.port}")
+            # Petits échanges requête/réponse : désactiver Nagle
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._rx_start = self._rx_end = 0
+            log.info("Connected to jCardSim at %s:%d", self.host, self.port)
             return True
         except Exception as e:
-            print(f"Failed to connect to jCardSim: {e}")
+            log.error("Failed to connect to jCardSim: %s", e)
             self.socket = None
             return False
 
+    def ensure_connected(self):
+        """Garde la connexion existante, ou se connecte s'il n'y en a pas."""
+        return self.socket is not None or self.connect()
+
     def disconnect(self):
         """Ferme la connexion."""
         if self.socket:
@@ -78,154 +164,320 @@ class JCardSimClient:
 
     def send_apdu(self, apdu):
         """Envoie un APDU à jCardSim et retourne la réponse."""
-        with self.lock:
-            if not self.socket:
-                if not self.connect():
-                    return bytes([0x6F, 0x00])  # Erreur interne
+        if not self.socket:
+            if not self.connect():
+                return bytes([0x6F, 0x00])  # Erreur interne
 
-            try:
-                # Envoyer: longueur (2 bytes) + APDU
-                length = struct.pack('>H', len(apdu))
-                self.socket.sendall(length + apdu)
+        try:
+            # Envoyer: longueur (2 bytes) + APDU
+            send_frame(self.socket, self._tx, apdu)
 
-                # Recevoir la réponse
-                resp_length_bytes = self._recv_exact(2)
-                if not resp_length_bytes:
-                    raise ConnectionError("No response from jCardSim")
+            # Recevoir la réponse
+            resp_length_bytes = self._recv_exact(2)
+            if not resp_length_bytes:
+                raise ConnectionError("No response from jCardSim")
 
-                resp_length = struct.unpack('>H', resp_length_bytes)[0]
-                response = self._recv_exact(resp_length)
+            resp_length = _U16.unpack(resp_length_bytes)[0]
+            response = self._recv_exact(resp_length)
 
-                return response if response else bytes([0x6F, 0x00])
+            return response if response else bytes([0x6F, 0x00])
 
-            except Exception as e:
-                print(f"APDU error: {e}")
-                self.disconnect()
-                return bytes([0x6F, 0x00])
+        except Exception as e:
+            log.error("APDU error: %s", e)
+            self.disconnect()
+            return bytes([0x6F, 0x00])
 
     def _recv_exact(self, length):
-        """Reçoit exactement 'length' bytes."""
-        data = b''
-        while len(data) < length:
-            chunk = self.socket.recv(length - len(data))
-            if not chunk:
-                return None
-            data += chunk
-        return data
+        """Reçoit exactement 'length' bytes via le tampon de réception.
+
+        Un seul recv_into ramène en général la longueur et la réponse.
+        """
+        if self._rx_end - self._rx_start < length:
+            # Ramener les bytes restants en tête du tampon
+            pending = self._rx_end - self._rx_start
+            if self._rx_start:
+                self._rx[:pending] = self._rx_view[self._rx_start:self._rx_end]
+            self._rx_start = 0
+            self._rx_end = pending
+
+            while self._rx_end < length:
+                n = self.socket.recv_into(self._rx_view[self._rx_end:])
+                if not n:
+                    return None
+                self._rx_end += n
+
+        start = self._rx_start
+        self._rx_start = start + length
+        return bytes(self._rx_view[start:self._rx_start])
 
 
-class VPCDHandler:
-    """Gère une connexion VPCD (depuis pcscd)."""
+class VPCDHandler(abc.ABC):
+    """Gère une connexion VPCD (depuis pcscd).
+
+    Le handler ne bloque pas en lecture : VPCDServer appelle on_readable()
+    quand le socket a des données, et les trames complètes sont extraites
+    du tampon de réception. Les réponses aux trames reçues ensemble sont
+    regroupées et envoyées en un seul sendall (bloquant, réponses courtes).
+
+    Les sous-classes implémentent _handle_frame() pour chaque variante du
+    protocole.
+    """
 
     def __init__(self, client_socket, jcardsim):
         self.client = client_socket
         self.jcardsim = jcardsim
         self.powered_on = False
-
-    def handle(self):
-        """Traite les commandes VPCD."""
-        print("VPCD client connected", flush=True)
-
+        self._tx = bytearray(FRAME_BUFSIZE)
+        self._tx_view = memoryview(self._tx)
+        self._tx_end = 0
+        self._rx = bytearray(FRAME_BUFSIZE)
+        self._rx_view = memoryview(self._rx)
+        self._rx_start = 0
+        self._rx_end = 0
+        log.info("VPCD client connected")
+
+    def on_readable(self):
+        """Lit les données disponibles et traite les trames complètes.
+
+        Retourne False quand la connexion est terminée.
+        """
         try:
-            while True:
-                # Lire la longueur (2 bytes big-endian)
-                length_bytes = self._recv_exact(2)
-                if not length_bytes:
-                    print("  No data received, closing", flush=True)
+            # Ramener la trame incomplète en tête du tampon
+            if self._rx_start == self._rx_end:
+                # Cas courant : toutes les trames ont été consommées
+                self._rx_start = self._rx_end = 0
+            elif self._rx_start:
+                pending = self._rx_end - self._rx_start
+                self._rx[:pending] = self._rx_view[self._rx_start:self._rx_end]
+                self._rx_start = 0
+                self._rx_end = pending
+
+            try:
+                n = self.client.recv_into(self._rx_view[self._rx_end:])
+            except BlockingIOError:
+                # Réveil sans données : la connexion reste ouverte
+                return True
+            except ConnectionError as e:
+                log.info("VPCD client connection lost: %s", e)
+                return False
+            if not n:
+                log.debug("  No data received, closing")
+                return False
+            self._rx_end += n
+
+            # Trame : longueur (2 bytes big-endian) + données
+            while self._rx_end - self._rx_start >= 2:
+                length = _U16.unpack_from(self._rx, self._rx_start)[0]
+                begin = self._rx_start + 2
+                if begin + length > self._rx_end:
                     break
+                self._rx_start = begin + length
+                if DEBUG:
+                    log.debug("  Received length: %d", length)
+
+                if length:
+                    # Vue sans copie, valable jusqu'au prochain recv_into
+                    self._handle_frame(self._rx_view[begin:self._rx_start])
+                # length == 0, rien à faire
 
-                length = struct.unpack('>H', length_bytes)[0]
-                print(f"  Received length: {length}", flush=True)
-
-                if length == 1:
-                    # Commande de contrôle (length=1 signifie commande VPCD)
-                    ctrl = self._recv_exact(1)
-                    if not ctrl:
-                        break
-                    self._handle_control(ctrl[0])
-                elif length > 1:
-                    # Commande APDU
-                    apdu = self._recv_exact(length)
-                    if not apdu:
-                        break
-                    self._handle_apdu(apdu)
-                else:
-                    # length == 0, rien à faire
-                    pass
+            self._flush()
+            return True
 
         except Exception as e:
-            print(f"VPCD handler error: {e}")
-        finally:
-            self.client.close()
-            print("VPCD client disconnected")
+            log.error("VPCD handler error: %s", e)
+            return False
 
-    def _handle_control(self, ctrl):
-        """Gère les commandes de contrôle VPCD."""
-        if ctrl == VPCD_CTRL_OFF:
-            print("  VPCD: Power OFF", flush=True)
-            self.powered_on = False
-            # Pas de réponse pour Power OFF
-
-        elif ctrl == VPCD_CTRL_ON:
-            print("  VPCD: Power ON", flush=True)
-            self.powered_on = True
-            # Pas de réponse pour Power ON
+    def close(self):
+        """Ferme la connexion VPCD."""
+        self.client.close()
+        log.info("VPCD client disconnected")
 
-        elif ctrl == VPCD_CTRL_RESET:
-            print("  VPCD: Reset", flush=True)
-            self.powered_on = True
-            # Pas de réponse pour Reset
+    @abc.abstractmethod
+    def _handle_frame(self, data):
+        """Traite une trame VPCD non vide (memoryview sur le tampon)."""
 
-        elif ctrl == VPCD_CTRL_ATR:
-            print("  VPCD: Get ATR", flush=True)
-            # Seul ATR envoie une réponse
-            self._send_response(DEFAULT_ATR)
+    def _send_response(self, data):
+        """Ajoute une réponse au tampon d'émission, envoyé par _flush()."""
+        n = len(data)
+        if self._tx_end + 2 + n > len(self._tx):
+            self._flush()
+        _U16.pack_into(self._tx, self._tx_end, n)
+        begin = self._tx_end + 2
+        self._tx_end = begin + n
+        self._tx[begin:self._tx_end] = data
+
+    def _send_frame(self, frame):
+        """Ajoute une trame déjà construite (longueur incluse) au tampon d'émission."""
+        if self._tx_end + len(frame) > len(self._tx):
+            self._flush()
+        begin = self._tx_end
+        self._tx_end = begin + len(frame)
+        self._tx[begin:self._tx_end] = frame
+
+    def _flush(self):
+        """Envoie les réponses en attente au client VPCD."""
+        if self._tx_end:
+            self.client.sendall(self._tx_view[:self._tx_end])
+            self._tx_end = 0
+
+
+class ControlVPCDHandler(VPCDHandler):
+    """Variante control : trame de 1 byte = commande, sinon APDU."""
+
+    def _handle_frame(self, data):
+        if len(data) == 1:
+            # Commande de contrôle (length=1 signifie commande VPCD)
+            self._handle_control(data[0])
+        else:
+            # Commande APDU
+            self._handle_apdu(data)
 
+    def _handle_control(self, ctrl):
+        """Gère les commandes de contrôle VPCD (aiguillage via _CONTROL_HANDLERS)."""
+        handler = self._CONTROL_HANDLERS.get(ctrl)
+        if handler is not None:
+            handler(self)
         else:
-            print(f"  VPCD: Unknown control {ctrl}", flush=True)
+            log.debug("  VPCD: Unknown control %d", ctrl)
             # Pas de réponse pour commande inconnue
 
+    def _power_off(self):
+        log.debug("  VPCD: Power OFF")
+        self.powered_on = False
+        # Pas de réponse pour Power OFF
+
+    def _power_on(self):
+        log.debug("  VPCD: Power ON")
+        self.powered_on = True
+        # Pas de réponse pour Power ON
+
+    def _reset(self):
+        log.debug("  VPCD: Reset")
+        self.powered_on = True
+        # Pas de réponse pour Reset
+
+    def _get_atr(self):
+        log.debug("  VPCD: Get ATR")
+        # Seul ATR envoie une réponse
+        self._send_frame(_ATR_FRAME)
+
+    _CONTROL_HANDLERS = {
+        VPCD_CTRL_OFF: _power_off,
+        VPCD_CTRL_ON: _power_on,
+        VPCD_CTRL_RESET: _reset,
+        VPCD_CTRL_ATR: _get_atr,
+    }
+
     def _handle_apdu(self, apdu):
         """Transmet un APDU à jCardSim."""
-        print(f"  VPCD APDU: {apdu.hex().upper()}")
+        if DEBUG:
+            log.debug("  VPCD APDU: %s", apdu.hex().upper())
 
         if not self.powered_on:
-            print("  Card not powered on!")
+            log.debug("  Card not powered on!")
             self._send_response(bytes([0x69, 0x00]))
             return
 
         # Transmettre à jCardSim
         response = self.jcardsim.send_apdu(apdu)
-        print(f"  Response: {response.hex().upper()}")
+        if DEBUG:
+            log.debug("  Response: %s", response.hex().upper())
 
         self._send_response(response)
 
-    def _send_response(self, data):
-        """Envoie une réponse au client VPCD."""
-        length = struct.pack('>H', len(data))
-        self.client.sendall(length + data)
 
-    def _recv_exact(self, length):
-        """Reçoit exactement 'length' bytes."""
-        data = b''
-        while len(data) < length:
-            try:
-                chunk = self.client.recv(length - len(data))
-                if not chunk:
-                    return None
-                data += chunk
-            except:
-                return None
-        return data
+class CyclicVPCDHandler(VPCDHandler):
+    """Variante cyclic : le premier byte de chaque trame est la commande."""
+
+    def _handle_frame(self, data):
+        """Aiguille la commande (premier byte) via _COMMAND_HANDLERS."""
+        handler = self._COMMAND_HANDLERS.get(data[0])
+        if handler is not None:
+            response = handler(self, data)
+        else:
+            log.debug("  << Unknown command: %02X", data[0])
+            response = b'\x01'  # Error
+
+        if response is not None:
+            self._send_response(response)
+
+    def _power_off(self, data):
+        log.debug("  << POWER OFF")
+        self.powered_on = False
+        # La connexion jCardSim est conservée : le simulateur est partagé et
+        # n'est pas réinitialisé par une reconnexion, seul l'état logique
+        # de la carte change
+        return b'\x00'  # Success
+
+    def _reset(self, data):
+        log.debug("  << RESET")
+        self.powered_on = True
+        if not self.jcardsim.ensure_connected():
+            return b''  # Empty = error
+        # After reset, return ATR directly (not just success code)
+        log.debug("  >> ATR: %s", _CYCLIC_ATR_HEX)
+        self._send_frame(_CYCLIC_ATR_FRAME)
+        return None
+
+    def _get_atr(self, data):
+        log.debug("  << GET ATR")
+        if not self.powered_on:
+            self.powered_on = True
+            self.jcardsim.ensure_connected()
+        log.debug("  >> ATR: %s", _CYCLIC_ATR_HEX)
+        self._send_frame(_CYCLIC_ATR_FRAME)
+        return None
+
+    def _apdu(self, data):
+        apdu = data[1:]
+        if DEBUG:
+            log.debug("  << APDU: %s", apdu.hex().upper())
+
+        if not self.powered_on:
+            self.powered_on = True
+            if not self.jcardsim.ensure_connected():
+                return b'\x6F\x00'
+
+        # send_apdu() renvoie 6F00 si jCardSim ne répond pas
+        response = self.jcardsim.send_apdu(apdu)
+        if DEBUG:
+            log.debug("  >> Response: %s", response.hex().upper())
+        return response
+
+    def _card_present(self, data):
+        # Card present check - respond that card is present (0x00 = present)
+        log.debug("  << CARD PRESENT CHECK")
+        return b'\x00'  # Card is present
+
+    _COMMAND_HANDLERS = {
+        CYCLIC_POWER_OFF: _power_off,
+        CYCLIC_RESET: _reset,
+        CYCLIC_GET_ATR: _get_atr,
+        CYCLIC_APDU: _apdu,
+        CYCLIC_CARD_PRESENT: _card_present,
+    }
+
+
+# Variantes du protocole VPCD, sélectionnées par VPCD_PROTOCOL
+PROTOCOLS = {
+    'control': ControlVPCDHandler,
+    'cyclic': CyclicVPCDHandler,
+}
 
 
 class VPCDServer:
-    """Serveur VPCD qui accepte les connexions de pcscd."""
+    """Serveur VPCD qui accepte les connexions de pcscd.
+
+    Un seul thread sert le socket d'écoute et toutes les connexions VPCD
+    via un sélecteur (epoll sous Linux), sans thread par connexion.
+    """
 
-    def __init__(self, port, jcardsim):
+    def __init__(self, port, jcardsim, handler_class):
         self.port = port
         self.jcardsim = jcardsim
+        self.handler_class = handler_class
         self.server_socket = None
+        self.selector = None
         self.running = False
 
     def start(self):
@@ -233,63 +485,127 @@ class VPCDServer:
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind(('0.0.0.0', self.port))
-        self.server_socket.listen(5)
+        self.server_socket.listen(socket.SOMAXCONN)
         self.running = True
 
         print(f"VPCD proxy server listening on port {self.port}")
         print(f"Forwarding APDUs to jCardSim at {JCARDSIM_HOST}:{JCARDSIM_PORT}")
 
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server_socket, selectors.EVENT_READ)
+
         while self.running:
-            try:
-                client, addr = self.server_socket.accept()
-                print(f"VPCD connection from {addr}", flush=True)
+            for key, _ in self.selector.select():
+                if key.fileobj is self.server_socket:
+                    self._accept()
+                elif not key.data.on_readable():
+                    self.selector.unregister(key.fileobj)
+                    key.data.close()
+
+    def _accept(self):
+        """Accepte une connexion VPCD et l'ajoute au sélecteur."""
+        try:
+            client, addr = self.server_socket.accept()
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            _set_keepalive(client)
+            log.info("VPCD connection from %s", addr)
 
-                handler = VPCDHandler(client, self.jcardsim)
-                thread = threading.Thread(target=handler.handle)
-                thread.daemon = True
-                thread.start()
+            handler = self.handler_class(client, self.jcardsim)
+            self.selector.register(client, selectors.EVENT_READ, handler)
 
-            except Exception as e:
-                if self.running:
-                    print(f"Server error: {e}")
+        except Exception as e:
+            if self.running:
+                log.error("Server error: %s", e)
 
     def stop(self):
         """Arrête le serveur."""
         self.running = False
+        if self.selector:
+            for key in list(self.selector.get_map().values()):
+                if key.data is not None:
+                    key.data.close()
+            self.selector.close()
         if self.server_socket:
             self.server_socket.close()
 
 
+def wait_for_jcardsim(host, port, timeout=60):
+    """Attend que jCardSim accepte les connexions.
+
+    Les tentatives commencent à 10 ms et doublent jusqu'à 1 s : le proxy
+    démarre dès que jCardSim écoute. connect_ex évite une exception par
+    tentative.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    attempt = 0
+
+    while True:
+        attempt += 1
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.5)
+            try:
+                err = sock.connect_ex((host, port))
+            except OSError:
+                # Résolution DNS impossible (conteneur pas encore démarré)
+                err = -1
+        if err == 0:
+            return True
+        now = time.monotonic()
+        if now >= deadline:
+            return False
+        if attempt % 10 == 0:
+            print(f"  Attempt {attempt}...")
+        time.sleep(min(delay, deadline - now))
+        delay = min(delay * 2, 1.0)
+
+
+def _on_sigterm(signum, frame):
+    """Convertit SIGTERM en KeyboardInterrupt pour passer par server.stop()."""
+    raise KeyboardInterrupt
+
+
 def main():
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO,
+                        format='%(message)s', stream=sys.stdout)
+
+    handler_class = PROTOCOLS.get(VPCD_PROTOCOL)
+    if handler_class is None:
+        print(f"ERROR: unknown VPCD_PROTOCOL '{VPCD_PROTOCOL}' "
+              f"(expected one of: {', '.join(PROTOCOLS)})")
+        sys.exit(1)
+
     print("=" * 60)
     print("  VPCD-jCardSim Proxy")
     print("=" * 60)
-    print(f"VPCD Port: {VPCD_PORT}")
+    print(f"VPCD Port: {VPCD_PORT} (protocol: {VPCD_PROTOCOL})")
     print(f"jCardSim: {JCARDSIM_HOST}:{JCARDSIM_PORT}")
     print("=" * 60)
 
     # Attendre que jCardSim soit disponible
     print("\nWaiting for jCardSim...")
-    for i in range(30):
-        try:
-            sock = socket.socket()
-            sock.settimeout(2)
-            sock.connect((JCARDSIM_HOST, JCARDSIM_PORT))
-            sock.close()
-            print("jCardSim is ready!")
-            break
-        except:
-            print(f"  Attempt {i+1}/30...")
-            time.sleep(2)
-    else:
+    if not wait_for_jcardsim(JCARDSIM_HOST, JCARDSIM_PORT):
         print("ERROR: jCardSim not available")
         sys.exit(1)
+    print("jCardSim is ready!")
+
+    # Épingler l'unique thread sur un cœur : la pile TCP, recv et le code
+    # Python partagent alors les mêmes caches
+    if VPCD_CPU is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {int(VPCD_CPU)})
+            print(f"Pinned to CPU {VPCD_CPU}")
+        except (ValueError, OSError) as e:
+            print(f"Cannot pin to CPU {VPCD_CPU}: {e}")
 
     # Créer le client jCardSim
     jcardsim = JCardSimClient(JCARDSIM_HOST, JCARDSIM_PORT)
 
     # Démarrer le serveur VPCD
-    server = VPCDServer(VPCD_PORT, jcardsim)
+    server = VPCDServer(VPCD_PORT, jcardsim, handler_class)
+
+    # docker stop (SIGTERM) : même arrêt propre que Ctrl+C
+    signal.signal(signal.SIGTERM, _on_sigterm)
 
     try:
         server.start()